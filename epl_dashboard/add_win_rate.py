@@ -1,48 +1,123 @@
+import argparse
+import json
+import os
+
 import pandas as pd
 
-# Load the dataset
-df = pd.read_csv('premier_league_cleaned.csv')
- 
-# 2023/24 Premier League final standings (Wins/Total Matches = Win Rate)
-# Based on actual 2023/24 season results
-team_standings = {
-    'Manchester City': {'wins': 28, 'matches': 38, 'points': 91, 'position': 1},
-    'Arsenal': {'wins': 28, 'matches': 38, 'points': 89, 'position': 2},
-    'Liverpool': {'wins': 24, 'matches': 38, 'points': 82, 'position': 3},
-    'Aston Villa': {'wins': 20, 'matches': 38, 'points': 68, 'position': 4},
-    'Tottenham Hotspur': {'wins': 20, 'matches': 38, 'points': 66, 'position': 5},
-    'Chelsea': {'wins': 18, 'matches': 38, 'points': 63, 'position': 6},
-    'Newcastle United': {'wins': 18, 'matches': 38, 'points': 60, 'position': 7},
-    'Manchester United': {'wins': 18, 'matches': 38, 'points': 60, 'position': 8},
-    'West Ham United': {'wins': 14, 'matches': 38, 'points': 52, 'position': 9},
-    'Crystal Palace': {'wins': 13, 'matches': 38, 'points': 49, 'position': 10},
-    'Brighton': {'wins': 12, 'matches': 38, 'points': 48, 'position': 11},
-    'Bournemouth': {'wins': 13, 'matches': 38, 'points': 48, 'position': 12},
-    'Fulham': {'wins': 13, 'matches': 38, 'points': 47, 'position': 13},
-    'Wolverhampton': {'wins': 13, 'matches': 38, 'points': 46, 'position': 14},
-    'Everton': {'wins': 13, 'matches': 38, 'points': 40, 'position': 15},
-    'Brentford': {'wins': 10, 'matches': 38, 'points': 39, 'position': 16},
-    'Nottingham Forest': {'wins': 9, 'matches': 38, 'points': 32, 'position': 17},
-    'Luton Town': {'wins': 6, 'matches': 38, 'points': 26, 'position': 18},
-    'Burnley': {'wins': 5, 'matches': 38, 'points': 24, 'position': 19},
-    'Sheffield United': {'wins': 3, 'matches': 38, 'points': 16, 'position': 20},
-}
-
-# Calculate win rate for each team
-for team in team_standings:
-    team_standings[team]['win_rate'] = (team_standings[team]['wins'] / team_standings[team]['matches']) * 100
-
-# Add win rate and team position to the dataframe
-df['Team_Win_Rate'] = df['Team'].map(lambda x: team_standings.get(x, {}).get('win_rate', 0))
-df['Team_Position'] = df['Team'].map(lambda x: team_standings.get(x, {}).get('position', 0))
-df['Team_Points'] = df['Team'].map(lambda x: team_standings.get(x, {}).get('points', 0))
-
-# Save the updated dataset
-df.to_csv('premier_league_with_win_rate.csv', index=False)
-
-print("Win rate data added successfully!")
-print(f"\nDataset now has {len(df.columns)} columns")
-print("\nNew columns added:")
-print("- Team_Win_Rate: Team's win percentage in 2023/24 season")
-print("- Team_Position: Final league position")
-print("- Team_Points: Total points earned")
+from data_loader import file_hash
+from timing import run, span
+
+# Adds each team's 2023/24 standings (win rate, position, points) to the
+# cleaned player data.
+#
+# Standings come from a standings table (Team, Wins, Matches, Points, Position)
+# and are attached to the players in one join per chunk, so the player file
+# never has to fit in memory. A manifest of input hashes next to the output
+# lets unchanged inputs skip the rebuild entirely.
+
+PLAYERS_FILE = 'premier_league_cleaned.csv'
+STANDINGS_FILE = 'team_standings_2023_24.csv'
+OUTPUT_FILE = 'premier_league_with_win_rate.csv'
+CHUNK_SIZE = 100_000
+
+TEAM_COLUMNS = ['Team_Win_Rate', 'Team_Position', 'Team_Points']
+
+
+def manifest_path(output_path):
+    return os.path.splitext(output_path)[0] + '.manifest.json'
+
+
+def load_standings(path):
+    standings = pd.read_csv(path)
+    standings.columns = standings.columns.str.strip()
+    # Win rate = wins / matches played, as a percentage
+    return pd.DataFrame({
+        'Team': standings['Team'].str.strip(),
+        'Team_Win_Rate': standings['Wins'] / standings['Matches'] * 100,
+        'Team_Position': standings['Position'].astype('Int64'),
+        'Team_Points': standings['Points'].astype('Int64'),
+    })
+
+
+def _input_hashes(players_path, standings_path):
+    return {'players': file_hash(players_path), 'standings': file_hash(standings_path)}
+
+
+def is_up_to_date(players_path, standings_path, output_path):
+    if not os.path.exists(output_path):
+        return False
+    try:
+        with open(manifest_path(output_path), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest.get('inputs') == _input_hashes(players_path, standings_path)
+
+
+def add_win_rate(players_path=PLAYERS_FILE, standings_path=STANDINGS_FILE, output_path=OUTPUT_FILE,
+                 chunk_size=CHUNK_SIZE):
+    """Write the player file with team standings attached.
+
+    Returns (rows written, column count, {unknown team: player rows}). Players
+    whose team is not in the standings keep empty standings columns instead of 0.
+    """
+    with span('load_standings'):
+        standings = load_standings(standings_path)
+
+    rows = 0
+    columns = 0
+    unknown = {}
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    for i, chunk in enumerate(pd.read_csv(players_path, chunksize=chunk_size)):
+        chunk.columns = chunk.columns.str.strip()
+        # Drop standings from an earlier run so the join doesn't duplicate them
+        chunk = chunk.drop(columns=[col for col in TEAM_COLUMNS if col in chunk.columns])
+
+        with span('join_chunk'):
+            enriched = chunk.merge(standings, on='Team', how='left', validate='many_to_one')
+
+        missing = enriched['Team_Win_Rate'].isna()
+        for team, count in enriched.loc[missing, 'Team'].value_counts(dropna=False).items():
+            unknown[team] = unknown.get(team, 0) + int(count)
+
+        enriched.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows += len(enriched)
+        columns = len(enriched.columns)
+
+    os.replace(tmp_path, output_path)
+    with open(manifest_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump({'inputs': _input_hashes(players_path, standings_path)}, f, indent=1)
+    return rows, columns, unknown
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add team win rate, position and points to the player data.")
+    parser.add_argument('--players', default=PLAYERS_FILE, help="cleaned player CSV")
+    parser.add_argument('--standings', default=STANDINGS_FILE, help="standings CSV (Team, Wins, Matches, Points, Position)")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="output CSV")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="player rows per chunk")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the inputs are unchanged")
+    args = parser.parse_args()
+
+    if not args.force and is_up_to_date(args.players, args.standings, args.output):
+        print(f"{args.output} is up to date - nothing to do.")
+        return
+
+    with run('add_win_rate', players=args.players, standings=args.standings):
+        rows, columns, unknown = add_win_rate(args.players, args.standings, args.output, args.chunk_size)
+
+    print("Win rate data added successfully!")
+    print(f"\nDataset now has {columns} columns ({rows} players)")
+    print("\nNew columns added:")
+    print("- Team_Win_Rate: Team's win percentage in 2023/24 season")
+    print("- Team_Position: Final league position")
+    print("- Team_Points: Total points earned")
+
+    if unknown:
+        print("\nWARNING: teams missing from the standings (standings left empty):")
+        for team, count in sorted(unknown.items(), key=lambda item: str(item[0])):
+            print(f"- {team}: {count} players")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,40 @@
-import pandas as pd
-import numpy as np
-from scipy import stats
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-# Load the dataset with win rate
-df = pd.read_csv('premier_league_with_win_rate.csv')
+import pandas as pd
 
-print("="*70)
-print("ANALYSIS: Does Player Performance Influence Team Win Rate?")
-print("="*70)
+import timing
+from correlations import get_correlations
+from data_loader import file_hash, file_signature, forget
+from leaderboards import get_team_leaderboard
+from season_store import PLAYERS_FILE, latest_partition, list_partitions, partition_path, query
+from team_aggregates import get_team_stats
 
-# Aggregate player performance by team
-team_stats = df.groupby('Team').agg({
-    'Team_Win_Rate': 'first',
-    'Team_Position': 'first',
-    'Team_Points': 'first',
-    'Gls_90': 'mean',
-    'Ast_90': 'mean',
-    'Contributions_90': 'mean',
-    'xG_90': 'mean',
-    'xAG_90': 'mean',
-    'Performance_vs_xG': 'mean',
-    'Performance_vs_xAG': 'mean',
-    'PrgC': 'mean',
-    'PrgP': 'mean',
-}).round(3)
+# Does player performance influence team win rate?
+#
+# Without arguments the analysis runs on the most recent season in the store,
+# prints the report and writes team_performance_summary.csv. Given players
+# files or directories (searched for players.csv), or --all-seasons, it runs in
+# batch mode instead: every input is analyzed in a process pool and gets its own
+# folder of outputs (summary.json, team_stats.csv, correlations.csv) under
+# --out-dir, next to a combined index.json/index.csv. Inputs whose content is
+# unchanged since the last run (same hash, same report version) are skipped.
+#
+#   python analyze_winrate.py
+#   python analyze_winrate.py --all-seasons --out-dir reports --jobs 8
+#   python analyze_winrate.py data/ other-leagues/ --out-dir reports
 
-team_stats = team_stats.sort_values('Team_Position')
+SUMMARY_FILE = 'team_performance_summary.csv'
+OUT_DIR = 'winrate_reports'
+INDEX_FILE = 'index.json'
+INDEX_CSV_FILE = 'index.csv'
 
-print("\nTeam Averages (sorted by league position):")
-print("="*70)
-print(team_stats[['Team_Win_Rate', 'Contributions_90', 'PrgP', 'PrgC']].head(10))
-
-# Correlation Analysis
-print("\n" + "="*70)
-print("CORRELATION ANALYSIS")
-print("="*70)
+# Bump when the report contents change, so the next batch run redoes every input
+REPORT_VERSION = 1
 
 metrics = {
     'Gls_90': 'Goals per 90',
@@ -48,80 +48,314 @@ metrics = {
     'PrgP': 'Progressive Passes',
 }
 
-correlations = {}
-for metric, name in metrics.items():
-    correlation, p_value = stats.pearsonr(team_stats[metric], team_stats['Team_Win_Rate'])
-    correlations[metric] = {
-        'name': name,
-        'correlation': correlation,
-        'p_value': p_value
-    }
-
-    significance = ''
-    if p_value < 0.001:
-        significance = '***'
-    elif p_value < 0.01:
-        significance = '**'
-    elif p_value < 0.05:
-        significance = '*'
-
-    print(f"\n{name}:")
-    print(f"  Correlation: {correlation:.4f} {significance}")
-    print(f"  P-value: {p_value:.4f}")
-
-# Find strongest correlations
-sorted_corr = sorted(correlations.items(), key=lambda x: abs(x[1]['correlation']), reverse=True)
-
-print("\n" + "="*70)
-print("TOP 5 STRONGEST CORRELATIONS WITH WIN RATE")
-print("="*70)
-for i, (metric, data) in enumerate(sorted_corr[:5], 1):
-    print(f"{i}. {data['name']}: r={data['correlation']:.4f} (p={data['p_value']:.4f})")
-
-# Compare top vs bottom teams
-print("\n" + "="*70)
-print("TOP 5 vs BOTTOM 5 TEAMS")
-print("="*70)
-
-top_5_teams = team_stats.nlargest(5, 'Team_Win_Rate').index.tolist()
-bottom_5_teams = team_stats.nsmallest(5, 'Team_Win_Rate').index.tolist()
-
-print("\nTop 5 teams average performance:")
-top_avg = df[df['Team'].isin(top_5_teams)].agg({
+# Squad averages compared between the top and bottom teams
+COMPARISON = {
     'Gls_90': 'mean',
     'Ast_90': 'mean',
     'Contributions_90': 'mean',
     'PrgP': 'mean'
-})
-print(top_avg.round(3))
+}
 
-print("\nBottom 5 teams average performance:")
-bottom_avg = df[df['Team'].isin(bottom_5_teams)].agg({
-    'Gls_90': 'mean',
-    'Ast_90': 'mean',
-    'Contributions_90': 'mean',
-    'PrgP': 'mean'
-})
-print(bottom_avg.round(3))
-
-print("\nDifference (Top - Bottom):")
-diff = top_avg - bottom_avg
-print(diff.round(3))
-
-print("\nPercentage difference:")
-pct_diff = ((top_avg - bottom_avg) / bottom_avg * 100).round(1)
-print(pct_diff)
-
-# Save results
-team_stats.to_csv('team_performance_summary.csv')
-
-print("\n" + "="*70)
-print("CONCLUSION")
-print("="*70)
-print(f"\n** YES, player performance STRONGLY influences team win rate! **")
-print(f"\nKey findings:")
-print(f"1. {sorted_corr[0][1]['name']} has the strongest correlation (r={sorted_corr[0][1]['correlation']:.3f})")
-print(f"2. {sorted_corr[1][1]['name']} also highly correlates (r={sorted_corr[1][1]['correlation']:.3f})")
-print(f"3. Top 5 teams have {pct_diff['Contributions_90']:.1f}% higher goal contributions than bottom 5")
-print(f"\nResults saved to: team_performance_summary.csv")
-print("="*70)
+
+def analyze(path):
+    """Run the analysis on one players file and return its results as a dict."""
+    # Aggregate player performance by team (shared with the dashboard)
+    team_stats = get_team_stats(path)
+
+    team_stats = team_stats.sort_values('Team_Position')
+
+    # All metrics against win rate in one batched pass (shared with the dashboard)
+    correlation_table = get_correlations(path, metrics=metrics)
+
+    correlations = {}
+    for metric, name in metrics.items():
+        correlation, p_value = correlation_table.loc[metric, ['r', 'p_value']]
+        correlations[metric] = {
+            'name': name,
+            'correlation': correlation,
+            'p_value': p_value
+        }
+
+    # Find strongest correlations
+    sorted_corr = sorted(correlations.items(), key=lambda x: abs(x[1]['correlation']), reverse=True)
+
+    # Compare top vs bottom teams
+    team_leaderboard = get_team_leaderboard(path)
+    top_5_teams = team_leaderboard.top('Team_Win_Rate', 5).index.tolist()
+    bottom_5_teams = team_leaderboard.top('Team_Win_Rate', 5, ascending=True).index.tolist()
+
+    top_avg = query(path=path, team=top_5_teams).agg(COMPARISON)
+    bottom_avg = query(path=path, team=bottom_5_teams).agg(COMPARISON)
+    diff = top_avg - bottom_avg
+    pct_diff = ((top_avg - bottom_avg) / bottom_avg * 100).round(1)
+
+    return {
+        'team_stats': team_stats,
+        'correlation_table': correlation_table,
+        'correlations': correlations,
+        'sorted_corr': sorted_corr,
+        'top_5_teams': top_5_teams,
+        'bottom_5_teams': bottom_5_teams,
+        'top_avg': top_avg,
+        'bottom_avg': bottom_avg,
+        'diff': diff,
+        'pct_diff': pct_diff,
+        'players': len(query(path=path)),
+    }
+
+
+def print_report(result, summary_file=SUMMARY_FILE):
+    team_stats = result['team_stats']
+    correlations = result['correlations']
+    sorted_corr = result['sorted_corr']
+    pct_diff = result['pct_diff']
+
+    print("="*70)
+    print("ANALYSIS: Does Player Performance Influence Team Win Rate?")
+    print("="*70)
+
+    print("\nTeam Averages (sorted by league position):")
+    print("="*70)
+    print(team_stats[['Team_Win_Rate', 'Contributions_90', 'PrgP', 'PrgC']].head(10))
+
+    # Correlation Analysis
+    print("\n" + "="*70)
+    print("CORRELATION ANALYSIS")
+    print("="*70)
+
+    for metric, data in correlations.items():
+        p_value = data['p_value']
+        significance = ''
+        if p_value < 0.001:
+            significance = '***'
+        elif p_value < 0.01:
+            significance = '**'
+        elif p_value < 0.05:
+            significance = '*'
+
+        print(f"\n{data['name']}:")
+        print(f"  Correlation: {data['correlation']:.4f} {significance}")
+        print(f"  P-value: {p_value:.4f}")
+
+    print("\n" + "="*70)
+    print("TOP 5 STRONGEST CORRELATIONS WITH WIN RATE")
+    print("="*70)
+    for i, (metric, data) in enumerate(sorted_corr[:5], 1):
+        print(f"{i}. {data['name']}: r={data['correlation']:.4f} (p={data['p_value']:.4f})")
+
+    print("\n" + "="*70)
+    print("TOP 5 vs BOTTOM 5 TEAMS")
+    print("="*70)
+
+    print("\nTop 5 teams average performance:")
+    print(result['top_avg'].round(3))
+
+    print("\nBottom 5 teams average performance:")
+    print(result['bottom_avg'].round(3))
+
+    print("\nDifference (Top - Bottom):")
+    print(result['diff'].round(3))
+
+    print("\nPercentage difference:")
+    print(pct_diff)
+
+    print("\n" + "="*70)
+    print("CONCLUSION")
+    print("="*70)
+    print(f"\n** YES, player performance STRONGLY influences team win rate! **")
+    print(f"\nKey findings:")
+    print(f"1. {sorted_corr[0][1]['name']} has the strongest correlation (r={sorted_corr[0][1]['correlation']:.3f})")
+    print(f"2. {sorted_corr[1][1]['name']} also highly correlates (r={sorted_corr[1][1]['correlation']:.3f})")
+    print(f"3. Top 5 teams have {pct_diff['Contributions_90']:.1f}% higher goal contributions than bottom 5")
+    print(f"\nResults saved to: {summary_file}")
+    print("="*70)
+
+
+def run_latest():
+    # Most recent season in the store
+    competition, season = latest_partition()
+    path = partition_path(competition, season)
+
+    # Stage timings go to the timing log when EPL_TIMING=1 (see timing.py)
+    timing.start('analyze_winrate', competition=competition, season=season)
+    result = analyze(path)
+
+    # Save results
+    with timing.span('write_summary'):
+        result['team_stats'].to_csv(SUMMARY_FILE)
+
+    print_report(result)
+    timing.finish()
+
+
+# Batch mode
+
+def find_inputs(inputs, all_seasons=False):
+    """Players files to analyze: files as given, directories searched for players.csv."""
+    paths = list(list_partitions().values()) if all_seasons else []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                if PLAYERS_FILE in files:
+                    paths.append(os.path.join(root, PLAYERS_FILE))
+        else:
+            paths.append(item)
+    # Each file once, in a stable order
+    return sorted({os.path.abspath(path) for path in paths})
+
+
+def report_name(path):
+    """Output folder for one input: its last path parts, plus a short hash of the full path."""
+    parts = os.path.splitext(path)[0].split(os.sep)[-3:]
+    return '__'.join(part for part in parts if part) + '-' + hashlib.sha1(path.encode()).hexdigest()[:8]
+
+
+def _summary(path, source_hash, result):
+    correlations = result['correlation_table']
+    return {
+        'source': path,
+        'source_hash': source_hash,
+        'report_version': REPORT_VERSION,
+        'players': result['players'],
+        'teams': len(result['team_stats']),
+        'correlations': {
+            metric: {'name': data['name'], 'r': float(data['correlation']), 'p_value': float(data['p_value']),
+                     'n': int(correlations.loc[metric, 'n']),
+                     'significance': str(correlations.loc[metric, 'Significance'])}
+            for metric, data in result['correlations'].items()
+        },
+        'strongest': [metric for metric, _ in result['sorted_corr'][:5]],
+        'top_5_teams': [str(team) for team in result['top_5_teams']],
+        'bottom_5_teams': [str(team) for team in result['bottom_5_teams']],
+        'top_avg': result['top_avg'].round(3).to_dict(),
+        'bottom_avg': result['bottom_avg'].round(3).to_dict(),
+        'pct_diff': result['pct_diff'].to_dict(),
+    }
+
+
+def analyze_to_files(path, source_hash, out_dir):
+    """Analyze one input and write its outputs. Returns its index entry; failures are recorded, not raised."""
+    name = report_name(path)
+    entry = {'name': name, 'source_hash': source_hash, 'report_version': REPORT_VERSION,
+             'analyzed_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    started = time.perf_counter()
+    try:
+        with timing.run('analyze_winrate:input', source=path):
+            result = analyze(path)
+            folder = os.path.join(out_dir, name)
+            os.makedirs(folder, exist_ok=True)
+            summary = _summary(path, source_hash, result)
+            result['team_stats'].to_csv(os.path.join(folder, 'team_stats.csv'))
+            result['correlation_table'].to_csv(os.path.join(folder, 'correlations.csv'))
+            with open(os.path.join(folder, 'summary.json'), 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=1)
+        strongest = summary['strongest'][0]
+        entry.update(status='ok', players=summary['players'], teams=summary['teams'],
+                     strongest_metric=strongest, strongest_r=summary['correlations'][strongest]['r'])
+    except Exception as e:
+        entry.update(status='error', error=f"{type(e).__name__}: {e}")
+    finally:
+        # Workers go through many files; keep only the one being analyzed
+        forget(path)
+    entry['seconds'] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def read_index(out_dir):
+    try:
+        with open(os.path.join(out_dir, INDEX_FILE), encoding='utf-8') as f:
+            return json.load(f)['reports']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_index(out_dir, reports):
+    # Written to a temporary file and renamed, so a crash never leaves half an index
+    index = {'report_version': REPORT_VERSION, 'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+             'reports': reports}
+    path = os.path.join(out_dir, INDEX_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+    table = pd.DataFrame.from_dict(reports, orient='index').rename_axis('source').reset_index()
+    table.to_csv(os.path.join(out_dir, INDEX_CSV_FILE + '.tmp'), index=False)
+    os.replace(os.path.join(out_dir, INDEX_CSV_FILE + '.tmp'), os.path.join(out_dir, INDEX_CSV_FILE))
+
+
+def _reusable(entry, out_dir):
+    # A finished report of the current version whose outputs are still there
+    return (entry is not None and entry.get('status') == 'ok'
+            and entry.get('report_version') == REPORT_VERSION
+            and os.path.exists(os.path.join(out_dir, entry['name'], 'summary.json')))
+
+
+def run_batch(inputs, out_dir=OUT_DIR, jobs=None, force=False, all_seasons=False):
+    """Analyze every input that changed since the last run. Returns the number of failures."""
+    os.makedirs(out_dir, exist_ok=True)
+    previous = read_index(out_dir)
+    paths = find_inputs(inputs, all_seasons)
+
+    reports = {}
+    todo = []
+    for path in paths:
+        entry = previous.get(path)
+        signature = list(file_signature(path))
+        reusable = not force and _reusable(entry, out_dir)
+        if reusable and entry.get('signature') == signature:
+            # Same size and mtime as last time - not even worth hashing
+            reports[path] = entry
+            continue
+        source_hash = file_hash(path)
+        if reusable and entry['source_hash'] == source_hash:
+            # Touched but not changed
+            reports[path] = dict(entry, signature=signature)
+            continue
+        todo.append((path, source_hash, signature))
+
+    print(f"{len(paths)} inputs: {len(todo)} to analyze, {len(paths) - len(todo)} unchanged")
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    arguments = ([path for path, _, _ in todo], [h for _, h, _ in todo], [out_dir] * len(todo))
+    if jobs <= 1 or len(todo) <= 1:
+        entries = map(analyze_to_files, *arguments)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(jobs, len(todo)))
+        entries = pool.map(analyze_to_files, *arguments)
+    try:
+        for (path, _, signature), entry in zip(todo, entries):
+            entry['signature'] = signature
+            reports[path] = entry
+            status = entry['status'] if entry['status'] == 'ok' else f"FAILED ({entry['error']})"
+            print(f"  {path}: {status} in {entry['seconds']:.2f}s")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    write_index(out_dir, reports)
+    failures = sum(1 for entry in reports.values() if entry['status'] != 'ok')
+    print(f"Index written to {os.path.join(out_dir, INDEX_FILE)} ({failures} failed)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Does player performance influence team win rate?")
+    parser.add_argument('inputs', nargs='*', help="players files or directories (batch mode)")
+    parser.add_argument('--all-seasons', action='store_true', help="analyze every season in the store (batch mode)")
+    parser.add_argument('--out-dir', default=OUT_DIR, help="where batch reports and the index are written")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="redo inputs even if unchanged")
+    args = parser.parse_args()
+
+    if not args.inputs and not args.all_seasons:
+        run_latest()
+        return
+    if run_batch(args.inputs, args.out_dir, args.jobs, args.force, args.all_seasons):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,490 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import socket
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from correlations import CORRELATION_METRICS, PEARSON, get_correlations
+from data_loader import data_version, pinned, refresher_running, served_version, start_refresher
+from leaderboards import get_prediction_leaderboard
+from metrics import METRICS, available, is_metric
+from percentiles import LEAGUE, POSITION, SCOPE_COLUMNS, get_percentile_index
+from player_index import get_player_index
+from predictions import get_predictions
+from season_store import list_partitions, partition_label
+from team_aggregates import get_team_stats
+
+# Headless JSON API over the same analytics code as the pages.
+#
+# One asyncio server per process speaks plain HTTP/1.1 (keep-alive, no
+# framework). Every response body is cached per (data version, endpoint,
+# parameters) and carries an ETag, so a repeated request is a dictionary lookup
+# on the event loop and a client that sends If-None-Match gets a bodyless 304.
+# Misses are computed on a thread pool, pinned to one data version (see
+# data_loader.py), from the shared per-version views the dashboard uses. A new
+# data version simply stops matching the old cache keys.
+#
+#   python api.py --port 8502
+#   curl 'localhost:8502/players?name=Bukayo%20Saka&name=Cole%20Palmer'
+#   curl 'localhost:8502/percentiles?name=Bukayo%20Saka&scope=team'
+#   curl -X POST localhost:8502/batch -d '{"requests": [{"path": "/teams"}, {"path": "/correlations"}]}'
+#
+# Endpoints (all GET, or POST with the parameters as a JSON object; `season`
+# picks a partition as competition/season and defaults to the latest one):
+#   /health, /seasons
+#   /players       name (repeatable), team
+#   /percentiles   name (repeatable), scope (league|position|team), metrics
+#   /teams
+#   /correlations  method (pearson|spearman), metrics, controls, teams
+#   /predictions   name (repeatable) for those players, otherwise the top n (0-100) by sort, team
+#   /metrics       the registry metrics (metrics.py) available for the season
+# Wherever a metric or column is taken, a registry metric name works too.
+#   /batch         {"requests": [{"path": ..., "params": {...}}, ...]} - one round trip
+
+HOST = '127.0.0.1'
+PORT = 8502
+MAX_ENTRIES = 4096
+MAX_BODY_BYTES = 1024 ** 2
+# Largest top-n list /predictions returns
+MAX_TOP_N = 100
+
+# Same radar metrics as the dashboard's player section
+PERCENTILE_METRICS = ['Gls_90', 'Ast_90', 'xG_90', 'xAG_90', 'Progressive_Actions']
+
+logger = logging.getLogger(__name__)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses, keyed by data version and request."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        entry = (f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"', body)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# One cache per process
+response_cache = ResponseCache()
+
+# Partition list, re-scanned when a request names a season it doesn't know
+_partitions = None
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+
+
+def _records(frame):
+    # pandas writes NaN as null and numpy scalars as plain numbers
+    return json.loads(frame.to_json(orient='records'))
+
+
+def _one(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _many(params, name, split=False):
+    values = params.get(name, [])
+    if split:
+        values = [part for value in values for part in value.split(',') if part]
+    return values
+
+
+def _names(params):
+    names = _many(params, 'name')
+    if not names:
+        raise BadRequest("at least one name is required")
+    return names
+
+
+def _int(params, name, default, maximum):
+    try:
+        value = int(_one(params, name, default))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if not 0 <= value <= maximum:
+        raise BadRequest(f"{name} must be between 0 and {maximum}")
+    return value
+
+
+def _scan():
+    global _partitions
+    _partitions = list_partitions()
+    return _partitions
+
+
+def players_file(params):
+    """Players file of the requested season (competition/season), the latest by default."""
+    partitions = _partitions or _scan()
+    season = _one(params, 'season')
+    if season is None:
+        # Oldest season first, as latest_partition() assumes
+        return partitions[next(reversed(partitions))]
+    partition = tuple(season.split('/', 1))
+    if partition not in partitions:
+        partitions = _scan()
+    if partition not in partitions:
+        raise BadRequest(f"unknown season: {season}")
+    return partitions[partition]
+
+
+def _profile(index, name, team=None):
+    """A player's row at `team`, or their (merged, if they moved) season line; None if unknown."""
+    if team is not None:
+        return index.get(team, name)
+    if len(index.rows(name)) == 0:
+        return None
+    return index.merged(name)
+
+
+def players_endpoint(path, params):
+    index = get_player_index(path)
+    team = _one(params, 'team')
+    found, missing = [], []
+    for name in _names(params):
+        profile = _profile(index, name, team)
+        if profile is None:
+            missing.append(name)
+        else:
+            found.append(json.loads(profile.to_json()))
+    return {'players': found, 'missing': missing}
+
+
+def percentiles_endpoint(path, params):
+    index = get_player_index(path)
+    percentiles = get_percentile_index(path)
+    scope = _one(params, 'scope', POSITION)
+    if scope not in SCOPE_COLUMNS:
+        raise BadRequest(f"scope must be one of {', '.join(SCOPE_COLUMNS)}")
+    metrics = _many(params, 'metrics', split=True) or PERCENTILE_METRICS
+    unknown = [m for m in metrics if not is_metric(index.players, m)]
+    if unknown:
+        raise BadRequest(f"unknown metrics: {', '.join(unknown)}")
+
+    team = _one(params, 'team')
+    results, missing = [], []
+    single_rows = {}
+    for name in _names(params):
+        profile = _profile(index, name, team)
+        if profile is None:
+            missing.append(name)
+            continue
+        if profile.name is None:
+            # Combined multi-club line - ranked league-wide within the position, as on the dashboard
+            used = LEAGUE if scope == LEAGUE else POSITION
+            group = () if used == LEAGUE else (profile['Primary_Pos'],)
+            values = percentiles.percentiles_of(profile, metrics, used, group)
+            results.append({'name': name, 'team': profile['Team'], 'scope': used,
+                             'percentiles': dict(zip(metrics, values))})
+        else:
+            single_rows.setdefault(profile.name, []).append(len(results))
+            results.append({'name': name, 'team': str(profile['Team']), 'scope': scope})
+
+    if single_rows:
+        # All single-club players are ranked in one batched lookup
+        table = percentiles.batch(list(single_rows), metrics, scope=scope)
+        for label, values in zip(table.index, _records(table)):
+            for position in single_rows[label]:
+                results[position]['percentiles'] = values
+    for result in results:
+        # No value (None from _records(), or NaN) has no percentile
+        result['percentiles'] = {metric: None if value is None or value != value else round(value, 2)
+                                 for metric, value in result['percentiles'].items()}
+    # The requested scope; each player reports the one it was ranked in
+    return {'scope': scope, 'players': results, 'missing': missing}
+
+
+def teams_endpoint(path, params):
+    return {'teams': _records(get_team_stats(path).reset_index())}
+
+
+def correlations_endpoint(path, params):
+    method = _one(params, 'method', PEARSON)
+    metrics = _many(params, 'metrics', split=True) or list(CORRELATION_METRICS)
+    teams = _many(params, 'teams', split=True) or None
+    controls = _many(params, 'controls', split=True)
+    try:
+        table = get_correlations(path, metrics=metrics, method=method, controls=controls, teams=teams)
+    except KeyError as e:
+        raise BadRequest(f"unknown column: {e}")
+    return {'method': method, 'correlations': _records(table.reset_index())}
+
+
+def predictions_endpoint(path, params):
+    team = _one(params, 'team')
+    names = _many(params, 'name')
+    if names:
+        predictions = get_predictions(path)
+        selected = predictions[predictions['Player'].isin(names)]
+        if team is not None:
+            selected = selected[selected['Team'] == team]
+        found = set(selected['Player'])
+        return {'predictions': _records(selected), 'missing': [name for name in names if name not in found]}
+
+    sort = _one(params, 'sort', 'Predicted_GA_2025')
+    if not is_metric(get_predictions(path), sort):
+        raise BadRequest(f"unknown sort column: {sort}")
+    top = get_prediction_leaderboard(path).top(sort, _int(params, 'n', 10, MAX_TOP_N), team=team)
+    return {'predictions': _records(top)}
+
+
+def metrics_endpoint(path, params):
+    names = available(get_player_index(path).players)
+    return {'metrics': [{'name': name, 'description': METRICS[name].description} for name in names]}
+
+
+def seasons_endpoint(params):
+    return {'seasons': [{'season': '/'.join(key), 'label': partition_label(key)} for key in _scan()]}
+
+
+ROUTES = {
+    '/players': players_endpoint,
+    '/percentiles': percentiles_endpoint,
+    '/teams': teams_endpoint,
+    '/correlations': correlations_endpoint,
+    '/predictions': predictions_endpoint,
+    '/metrics': metrics_endpoint,
+}
+
+
+def _cache_key(route, params, version):
+    return (version, route, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+
+
+def cached(route, params):
+    """Cached (etag, body) for a data endpoint, or None if it has to be computed."""
+    return response_cache.get(_cache_key(route, params, data_version(players_file(params))))
+
+
+@pinned
+def compute(route, params):
+    """Compute, cache and return (etag, body) for a data endpoint."""
+    path = players_file(params)
+    body = _dumps(ROUTES[route](path, params))
+    return response_cache.put(_cache_key(route, params, data_version(path)), body)
+
+
+def _normalize(params):
+    # JSON bodies take the same parameters as query strings: {name: value or [values]}
+    if not isinstance(params, dict):
+        raise BadRequest("parameters must be a JSON object")
+    return {str(name): [str(v) for v in (values if isinstance(values, list) else [values])]
+            for name, values in params.items()}
+
+
+def respond(route, params):
+    """(status, etag, body) for one request, computing it if needed. Runs off the event loop."""
+    try:
+        if route == '/health':
+            return HTTPStatus.OK, None, _dumps({'status': 'ok', 'cache': response_cache.stats()})
+        if route == '/seasons':
+            return HTTPStatus.OK, None, _dumps(seasons_endpoint(params))
+        if route == '/batch':
+            return HTTPStatus.OK, None, batch(params)
+        if route not in ROUTES:
+            return HTTPStatus.NOT_FOUND, None, _dumps({'error': f"no such endpoint: {route}"})
+        etag, body = cached(route, params) or compute(route, params)
+        return HTTPStatus.OK, etag, body
+    except BadRequest as e:
+        return HTTPStatus.BAD_REQUEST, None, _dumps({'error': str(e)})
+    except FileNotFoundError as e:
+        return HTTPStatus.NOT_FOUND, None, _dumps({'error': f"data file not found: {e.filename}"})
+    except Exception:
+        logger.exception("Request %s %s failed", route, params)
+        return HTTPStatus.INTERNAL_SERVER_ERROR, None, _dumps({'error': "internal error"})
+
+
+def batch(params):
+    """Many endpoint requests in one body; each answer is the cached body spliced in."""
+    requests = params.get('requests') if isinstance(params, dict) else None
+    if not isinstance(requests, list):
+        raise BadRequest("batch body must be {\"requests\": [...]}")
+    parts = []
+    for request in requests:
+        if not isinstance(request, dict):
+            raise BadRequest("every batch request must be a JSON object")
+        if not isinstance(request.get('path'), str) or request['path'] == '/batch':
+            raise BadRequest("every batch request needs a path (and no nested batches)")
+        status, _, body = respond(request['path'], _normalize(request.get('params', {})))
+        parts.append(b'{"path":' + _dumps(request['path']) + b',"status":' + str(int(status)).encode() +
+                     b',"body":' + body + b'}')
+    return b'{"responses":[' + b','.join(parts) + b']}'
+
+
+def _response(status, etag, body, keep_alive):
+    headers = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if etag is not None:
+        # Clients revalidate with If-None-Match; the tag changes with the data
+        headers += [f"ETag: {etag}", "Cache-Control: no-cache"]
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, target, version = request_line.decode('latin-1').split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_BYTES:
+        raise BadRequest("request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+async def handle(method, target, headers, body):
+    url = urlsplit(target)
+    route = url.path.rstrip('/') or '/'
+    if method == 'GET':
+        params = parse_qs(url.query)
+    elif method == 'POST':
+        if route == '/batch':
+            params = json.loads(body or b'{}')
+        else:
+            params = _normalize(json.loads(body or b'{}'))
+    else:
+        return HTTPStatus.METHOD_NOT_ALLOWED, None, _dumps({'error': "use GET or POST"})
+
+    # Repeated requests are answered on the event loop without leaving it. The
+    # loop never touches the files: it only looks up the version being served,
+    # which the refresher keeps current. Everything else (a season that isn't
+    # loaded, a cache miss, or no refresher to check the files) goes to the
+    # thread pool.
+    hit = None
+    if route in ROUTES and refresher_running():
+        try:
+            version = served_version(players_file(params))
+        except BadRequest:
+            version = None
+        if version is not None:
+            hit = response_cache.get(_cache_key(route, params, version))
+    if hit is not None:
+        status, (etag, response_body) = HTTPStatus.OK, hit
+    else:
+        loop = asyncio.get_running_loop()
+        status, etag, response_body = await loop.run_in_executor(None, respond, route, params)
+
+    if etag is not None and headers.get('if-none-match') == etag:
+        return HTTPStatus.NOT_MODIFIED, etag, b''
+    return status, etag, response_body
+
+
+async def serve_connection(reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except (BadRequest, ValueError) as e:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, None, _dumps({'error': str(e)}), False))
+                break
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            try:
+                status, etag, response_body = await handle(method, target, headers, body)
+            except ValueError as e:
+                # Malformed JSON body
+                status, etag, response_body = HTTPStatus.BAD_REQUEST, None, _dumps({'error': str(e)})
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            writer.write(_response(status, etag, response_body, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=HOST, port=PORT, sock=None):
+    if sock is not None:
+        server = await asyncio.start_server(serve_connection, sock=sock)
+    else:
+        server = await asyncio.start_server(serve_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def run_server(host=HOST, port=PORT, sock=None, warm=True):
+    start_refresher()
+    if warm:
+        # Load the latest season up front so the first requests don't wait for the parse
+        get_player_index(players_file({}))
+    asyncio.run(serve(host, port, sock))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard analytics as a JSON API.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--processes', type=int, default=1,
+                        help="server processes sharing the port (one event loop each)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.processes <= 1:
+        logger.info("Serving on http://%s:%d", args.host, args.port)
+        run_server(args.host, args.port)
+        return
+
+    # Several processes accept on one listening socket; each loads its own data
+    import multiprocessing
+    sock = socket.create_server((args.host, args.port))
+    sock.set_inheritable(True)
+    logger.info("Serving on http://%s:%d with %d processes", args.host, args.port, args.processes)
+    workers = [multiprocessing.get_context('fork').Process(target=run_server, args=(args.host, args.port, sock))
+               for _ in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == '__main__':
+    main()
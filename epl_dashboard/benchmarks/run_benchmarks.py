@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Headless end-to-end rerun latency benchmarks.
+#
+# Drives the real pages with Streamlit's AppTest through a scripted session -
+# cold start, pick a team, pick a player, change the metric - on synthetic
+# files of several sizes, and records the latency of every step plus the peak
+# memory of the process. Each (page, size) runs in its own process so cold
+# starts and peak memory are measured from scratch.
+#
+# Results are written as JSON; pass an earlier results file with --compare to
+# see the change per step between two commits.
+#
+# --profile-startup instead starts each page once in a fresh interpreter under
+# `python -X importtime` with stage timing on (see timing.py), and reports what
+# a new worker spends on imports - in total and per heavy module - and on the
+# first render, stage by stage.
+#
+#   python benchmarks/run_benchmarks.py --sizes 500 50000 --output bench.json
+#   python benchmarks/run_benchmarks.py --compare bench.json
+#   python benchmarks/run_benchmarks.py --profile-startup --sizes 500 --output startup.json
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic_data import COMPETITION, DEFAULT_SIZES, partition_file, write_players  # noqa: E402
+
+PAGES = {
+    'dashboard': 'epl_dashboard.py',
+    'prediction': os.path.join('pages', '1_2025_prediction.py'),
+}
+RESULTS_FILE = 'benchmark_results.json'
+TIMEOUT = 600
+
+# Modules whose import cost --profile-startup reports on their own
+HEAVY_MODULES = ['streamlit', 'pandas', 'numpy', 'pyarrow', 'plotly.graph_objects', 'plotly.express',
+                 'scipy.special', 'scipy.stats']
+
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed(steps, name, at):
+    start = time.perf_counter()
+    at.run()
+    steps[name] = round((time.perf_counter() - start) * 1000, 1)
+    if at.exception:
+        raise RuntimeError(f"{name}: {at.exception[0].value}")
+
+
+def _selectbox(at, label, key=None):
+    for box in at.selectbox:
+        if label in box.label and (key is None or box.key == key):
+            return box
+    raise LookupError(label)
+
+
+def run_session(page, n_players):
+    """Scripted session on one page. Returns {step: milliseconds}."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(APP_DIR, PAGES[page]), default_timeout=TIMEOUT)
+    at.session_state['season'] = (COMPETITION, str(n_players))
+    steps = {}
+    _timed(steps, 'cold_start', at)
+    _timed(steps, 'rerun', at)
+
+    pick_key = 'pred_team' if page == 'prediction' else None
+    team_box = _selectbox(at, "Select Team", pick_key)
+    team_box.select(team_box.options[1])
+    _timed(steps, 'select_team', at)
+
+    player_box = _selectbox(at, "Select Player", 'pred_player' if page == 'prediction' else None)
+    player_box.select(player_box.options[min(2, len(player_box.options) - 1)])
+    _timed(steps, 'select_player', at)
+
+    if page == 'dashboard':
+        _selectbox(at, "Performance Metric").select('PrgP')
+        _timed(steps, 'change_metric', at)
+    return steps
+
+
+def first_render(page, n_players):
+    """Cold run of one page. Returns {step: milliseconds} with its timing spans."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(APP_DIR, PAGES[page]), default_timeout=TIMEOUT)
+    at.session_state['season'] = (COMPETITION, str(n_players))
+    steps = {}
+    _timed(steps, 'first_render', at)
+
+    # The run just logged is the last line for this page in the timing log
+    import timing
+    with open(timing.LOG_FILE, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    record = [r for r in records if r['run'] == page][-1]
+    for name, ms in record['spans']:
+        steps[f'span:{name}'] = round(steps.get(f'span:{name}', 0) + ms, 1)
+    return steps
+
+
+def worker(page, n_players, data_dir, startup=False):
+    # The data tree has to be set before the pages import season_store
+    os.environ['EPL_DATA_DIR'] = data_dir
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    steps = first_render(page, n_players) if startup else run_session(page, n_players)
+    print(json.dumps({'page': page, 'players': n_players, 'steps_ms': steps,
+                      'peak_rss_mb': round(_peak_rss_mb(), 1)}))
+
+
+def parse_importtime(output):
+    """Import costs from `python -X importtime` output.
+
+    Returns (total ms of top-level imports, {module: cumulative ms}).
+    """
+    total = 0.0
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        ms = int(cumulative) / 1000
+        # Nested imports are indented two spaces per level
+        if not name[1:].startswith(' '):
+            total += ms
+        modules.setdefault(name.strip(), ms)
+    return round(total, 1), modules
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(sizes, pages, data_dir, startup=False):
+    results = []
+    for n_players in sizes:
+        if not os.path.exists(partition_file(data_dir, n_players)):
+            write_players(data_dir, n_players)
+        for page in pages:
+            command = [sys.executable, os.path.abspath(__file__), '--worker', page, str(n_players),
+                       '--data-dir', data_dir]
+            env = dict(os.environ)
+            if startup:
+                command = [sys.executable, '-X', 'importtime'] + command[1:] + ['--startup']
+                env.update(EPL_TIMING='1', EPL_TIMING_LOG=os.path.join(data_dir, 'timing.jsonl'))
+            proc = subprocess.run(command, capture_output=True, text=True, timeout=TIMEOUT, env=env)
+            if proc.returncode != 0:
+                raise RuntimeError(f"{page} @ {n_players} players failed:\n{proc.stderr[-5000:]}")
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+            if startup:
+                total, modules = parse_importtime(proc.stderr)
+                imports = {'imports': total}
+                imports.update({f'import:{name}': modules[name] for name in HEAVY_MODULES if name in modules})
+                result['steps_ms'] = {**imports, **result['steps_ms']}
+            if startup:
+                print(f"{page} @ {n_players} players (peak {result['peak_rss_mb']:.0f}MB)")
+                for step, ms in result['steps_ms'].items():
+                    print(f"  {step:<40} {ms:8.1f}ms")
+            else:
+                print(f"{page:>10} {n_players:>8} players  " +
+                      "  ".join(f"{step}={ms:.0f}ms" for step, ms in result['steps_ms'].items()) +
+                      f"  peak={result['peak_rss_mb']:.0f}MB")
+            results.append(result)
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(baseline, current):
+    """Print the per-step change from `baseline` to `current`."""
+    before = {(r['page'], r['players']): r for r in baseline['results']}
+    print(f"\n{baseline.get('commit')} -> {current.get('commit')}")
+    for result in current['results']:
+        old = before.get((result['page'], result['players']))
+        if old is None:
+            continue
+        for step, ms in result['steps_ms'].items():
+            if step in old['steps_ms']:
+                was = old['steps_ms'][step]
+                change = (ms - was) / was * 100 if was else 0.0
+                print(f"{result['page']:>10} {result['players']:>8} {step:>14}: "
+                      f"{was:8.0f}ms -> {ms:8.0f}ms ({change:+.0f}%)")
+        was = old['peak_rss_mb']
+        print(f"{result['page']:>10} {result['players']:>8} {'peak_rss':>14}: "
+              f"{was:8.0f}MB -> {result['peak_rss_mb']:8.0f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard rerun latency on synthetic data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="player counts")
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES))
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'epl-benchmark-data'),
+                        help="where the synthetic files are generated (reused between runs)")
+    parser.add_argument('--output', default=RESULTS_FILE, help="results JSON to write")
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="report import time and the first-render breakdown instead")
+    parser.add_argument('--worker', nargs=2, metavar=('PAGE', 'PLAYERS'), help=argparse.SUPPRESS)
+    parser.add_argument('--startup', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], int(args.worker[1]), args.data_dir, args.startup)
+        return
+
+    results = run_all(args.sizes, args.pages, args.data_dir, args.profile_startup)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic player files with the same schema as premier_league_with_win_rate.csv.
+#
+# Rows are resampled from the real 2023/24 file and perturbed, then every
+# derived column is recomputed so the files stay internally consistent.
+# Players are spread over synthetic clubs of ~25 players, each with its own
+# standings. Files are written in the season store layout:
+#   <out-dir>/synthetic/<players>/players.csv
+#
+#   python benchmarks/synthetic_data.py --sizes 500 50000 500000 --out-dir /tmp/epl-bench
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_FILE = os.path.join(BENCH_DIR, '..', 'premier_league_with_win_rate.csv')
+COMPETITION = 'synthetic'
+
+DEFAULT_SIZES = [500, 50_000, 500_000]
+PLAYERS_PER_TEAM = 25
+MATCHES = 38
+
+# Counting stats that get a random per-player scale
+SCALED_COLUMNS = ['Gls', 'Ast', 'xG', 'xAG', 'npxG', 'PrgC', 'PrgP']
+
+
+def generate_players(n_players, template_path=TEMPLATE_FILE, players_per_team=PLAYERS_PER_TEAM, seed=0):
+    rng = np.random.default_rng(seed)
+    template = pd.read_csv(template_path)
+    template.columns = template.columns.str.strip()
+
+    players = template.iloc[rng.integers(0, len(template), n_players)].reset_index(drop=True)
+    players['Player'] = [f"Player {i:07d}" for i in range(n_players)]
+    players['Age'] = np.clip(players['Age'] + rng.integers(-2, 3, n_players), 16, 40).astype(float)
+
+    # Perturb playing time and output
+    players['90s'] = np.clip(np.round(players['90s'] * rng.lognormal(0, 0.1, n_players), 1), 1.0, 38.0)
+    scale = rng.lognormal(0, 0.2, n_players)
+    for col in SCALED_COLUMNS:
+        players[col] = players[col] * scale
+    for col in ['Gls', 'Ast', 'PrgC', 'PrgP']:
+        players[col] = np.round(players[col])
+    for col in ['xG', 'xAG', 'npxG']:
+        players[col] = np.round(players[col], 1)
+    players['npxG'] = np.minimum(players['npxG'], players['xG'])
+
+    # Recompute everything derived from the perturbed columns
+    nineties = players['90s']
+    players['G+A'] = players['Gls'] + players['Ast']
+    players['npxG+xAG'] = players['npxG'] + players['xAG']
+    players['Gls_90'] = np.round(players['Gls'] / nineties, 2)
+    players['Ast_90'] = np.round(players['Ast'] / nineties, 2)
+    players['xG_90'] = np.round(players['xG'] / nineties, 2)
+    players['xAG_90'] = np.round(players['xAG'] / nineties, 2)
+    players['Contributions_90'] = players['Gls_90'] + players['Ast_90']
+    players['xContributions_90'] = players['xG_90'] + players['xAG_90']
+    players['Performance_vs_xG'] = players['Gls'] - players['xG']
+    players['Performance_vs_xAG'] = players['Ast'] - players['xAG']
+    minutes = nineties * 90
+    players['Minutes_per_Goal'] = (minutes / players['Gls'].where(players['Gls'] > 0)).fillna(0)
+    players['Minutes_per_Assist'] = (minutes / players['Ast'].where(players['Ast'] > 0)).fillna(0)
+
+    # Clubs and their standings - stronger squads (more output) win more
+    n_teams = max(n_players // players_per_team, 2)
+    team_ids = rng.permutation(np.arange(n_players) % n_teams)
+    players['Team'] = [f"Synthetic FC {i:05d}" for i in team_ids]
+
+    strength = players.groupby(team_ids)['Contributions_90'].mean().to_numpy()
+    strength = (strength - strength.mean()) / (strength.std() or 1.0)
+    wins = np.clip(np.round(14 + 6 * strength + rng.normal(0, 3, n_teams)), 0, MATCHES).astype(int)
+    draws = np.clip(rng.integers(5, 12, n_teams), 0, MATCHES - wins)
+    points = wins * 3 + draws
+    position = np.empty(n_teams, dtype=int)
+    position[np.argsort(-points, kind='stable')] = np.arange(1, n_teams + 1)
+
+    players['Team_Win_Rate'] = (wins / MATCHES * 100)[team_ids]
+    players['Team_Position'] = position[team_ids]
+    players['Team_Points'] = points[team_ids]
+    return players[template.columns]
+
+
+def partition_file(out_dir, n_players):
+    return os.path.join(out_dir, COMPETITION, str(n_players), 'players.csv')
+
+
+def write_players(out_dir, n_players, seed=0):
+    path = partition_file(out_dir, n_players)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    generate_players(n_players, seed=seed).to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic player files for benchmarking.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="player counts")
+    parser.add_argument('--out-dir', required=True, help="data directory to write into")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for n_players in args.sizes:
+        print(write_players(args.out_dir, n_players, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Cleaning pipeline for raw FBref-style player exports (premier-player-23-24.csv).
+#
+# Applies the same stages as the cleaning cells in sport_Analysis.ipynb, one
+# chunk at a time, so raw exports of any size are cleaned in bounded memory:
+#   1. keep the analysis columns and normalize Nation ("eng ENG" -> "ENG")
+#   2. drop players with less than one full match (90s < 1.0)
+#   3. recalculate npxG+xAG
+#   4. derive Primary_Pos from the first listed position
+#   5. add the per-90 and efficiency columns
+# The data dictionary is then written from the columns actually produced.
+#
+#   python cleaning.py premier-player-23-24.csv
+
+RAW_FILE = 'premier-player-23-24.csv'
+OUTPUT_FILE = 'premier_league_cleaned.csv'
+DICTIONARY_FILE = 'data_dictionary.txt'
+CHUNK_SIZE = 100_000
+
+MIN_90S = 1.0
+
+COLUMNS_NEEDED = [
+    'Player', 'Nation', 'Team', 'Pos', 'Age', 'MP', 'Starts', '90s', 'Gls', 'Ast', 'G+A',
+    'xG', 'xAG', 'npxG', 'npxG+xAG', 'PrgC', 'PrgP', 'CrdY', 'CrdR',
+    'Gls_90', 'Ast_90', 'xG_90', 'xAG_90',
+]
+
+COLUMN_DESCRIPTIONS = {
+    'Player': 'Player name',
+    'Nation': 'Player nationality',
+    'Team': 'Club/Team name',
+    'Pos': 'Position(s) - may include multiple',
+    'Primary_Pos': 'Primary position (DF, MF, FW, GK)',
+    'Age': 'Player age',
+    'MP': 'Matches played (appearances)',
+    'Starts': 'Matches started',
+    '90s': '90-minute match equivalents',
+    'Gls': 'Goals scored',
+    'Ast': 'Assists',
+    'G+A': 'Goals + Assists combined',
+    'xG': 'Expected Goals',
+    'xAG': 'Expected Assists',
+    'npxG': 'Non-Penalty Expected Goals',
+    'npxG+xAG': 'Non-Penalty xG + xAG (RECALCULATED)',
+    'PrgC': 'Progressive Carries',
+    'PrgP': 'Progressive Passes',
+    'CrdY': 'Yellow Cards',
+    'CrdR': 'Red Cards',
+    'Gls_90': 'Goals per 90 minutes',
+    'Ast_90': 'Assists per 90 minutes',
+    'xG_90': 'Expected Goals per 90 minutes',
+    'xAG_90': 'Expected Assists per 90 minutes',
+    'Contributions_90': 'Goals + Assists per 90 (NEW)',
+    'xContributions_90': 'xG + xAG per 90 (NEW)',
+    'Performance_vs_xG': 'Actual Goals - Expected Goals (NEW)',
+    'Performance_vs_xAG': 'Actual Assists - Expected Assists (NEW)',
+    'Minutes_per_Goal': 'Minutes played per goal scored (NEW)',
+    'Minutes_per_Assist': 'Minutes played per assist (NEW)',
+}
+
+# Dictionary order: identity and position first, then the stats in file order
+DICTIONARY_ORDER = ['Player', 'Nation', 'Team', 'Pos', 'Primary_Pos']
+
+
+def add_calculated_columns(frame):
+    """Add (or recompute) the step 5 columns from the totals and per-90 columns, in place."""
+    frame['Contributions_90'] = frame['Gls_90'] + frame['Ast_90']
+    frame['xContributions_90'] = frame['xG_90'] + frame['xAG_90']
+    frame['Performance_vs_xG'] = frame['Gls'] - frame['xG']
+    frame['Performance_vs_xAG'] = frame['Ast'] - frame['xAG']
+    # Minutes per goal/assist, 0 for players without any
+    minutes = frame['90s'] * 90
+    frame['Minutes_per_Goal'] = (minutes / frame['Gls'].where(frame['Gls'] > 0)).fillna(0)
+    frame['Minutes_per_Assist'] = (minutes / frame['Ast'].where(frame['Ast'] > 0)).fillna(0)
+    return frame
+
+
+def clean_chunk(raw, stats):
+    """Clean one chunk of raw rows, updating the running `stats`."""
+    # Step 1: keep the analysis columns; Nation comes as "eng ENG" - keep the country code
+    raw.columns = raw.columns.str.strip()
+    chunk = raw[COLUMNS_NEEDED].copy()
+    stats['raw_rows'] += len(chunk)
+    chunk['Nation'] = chunk['Nation'].str.split(' ').str[1]
+
+    # Step 2: remove players with insufficient playing time
+    chunk = chunk[chunk['90s'] >= MIN_90S].copy()
+
+    # Step 3: recalculate npxG+xAG
+    recalculated = chunk['npxG'] + chunk['xAG']
+    stats['npxg_fixed'] += int(((chunk['npxG+xAG'] - recalculated).abs() > 0.01).sum())
+    chunk['npxG+xAG'] = recalculated
+
+    # Step 4: primary position (first position listed)
+    chunk['Primary_Pos'] = chunk['Pos'].str.split(',').str[0]
+
+    # Step 5: calculated columns
+    add_calculated_columns(chunk)
+
+    stats['rows'] += len(chunk)
+    count_moved(chunk['Player'].dropna(), stats)
+    stats['accented'] += int(chunk['Player'].str.contains(r'[^\x00-\x7F]', na=False).sum())
+    stats['teams'].update(chunk['Team'].dropna().unique())
+    return chunk
+
+
+def new_stats():
+    return {
+        'raw_rows': 0,
+        'rows': 0,
+        'npxg_fixed': 0,
+        'accented': 0,
+        'teams': set(),
+        # 64-bit hashes of the names seen so far, and of those seen more than once
+        'seen': np.empty(0, dtype=np.uint64),
+        'moved': np.empty(0, dtype=np.uint64),
+    }
+
+
+def count_moved(players, stats):
+    """Track names that appear more than once (players who moved clubs) across chunks."""
+    hashes, counts = np.unique(pd.util.hash_pandas_object(players, index=False).to_numpy(), return_counts=True)
+    repeated = hashes[(counts > 1) | np.isin(hashes, stats['seen'], assume_unique=True)]
+    stats['moved'] = np.union1d(stats['moved'], repeated)
+    stats['seen'] = np.union1d(stats['seen'], hashes)
+
+
+def clean_file(raw_path=RAW_FILE, output_path=OUTPUT_FILE, chunk_size=CHUNK_SIZE):
+    """Stream `raw_path` through the pipeline into `output_path`. Returns (columns, stats)."""
+    stats = new_stats()
+    columns = []
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    for i, raw in enumerate(pd.read_csv(raw_path, chunksize=chunk_size)):
+        chunk = clean_chunk(raw, stats)
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        columns = list(chunk.columns)
+    if not columns:
+        # A header-only export can yield no chunk - still write the (empty) cleaned file
+        chunk = clean_chunk(pd.read_csv(raw_path, nrows=0), stats)
+        chunk.to_csv(tmp_path, index=False)
+        columns = list(chunk.columns)
+    os.replace(tmp_path, output_path)
+    return columns, stats
+
+
+def write_data_dictionary(columns, stats, output_path=OUTPUT_FILE, dictionary_path=DICTIONARY_FILE):
+    """Write the data dictionary for the columns the pipeline produced."""
+    ordered = [col for col in DICTIONARY_ORDER if col in columns]
+    ordered += [col for col in columns if col not in ordered]
+    derived_count = sum(1 for col in columns if COLUMN_DESCRIPTIONS.get(col, '').endswith('(NEW)'))
+    moved = len(stats['moved'])
+
+    with open(dictionary_path, 'w', encoding='utf-8') as f:
+        f.write("=" * 70 + "\n")
+        f.write("PREMIER LEAGUE 2023/24 - DATA DICTIONARY\n")
+        f.write("=" * 70 + "\n\n")
+        f.write(f"Dataset: {os.path.basename(output_path)}\n")
+        f.write(f"Rows: {stats['rows']}\n")
+        f.write(f"Columns: {len(columns)}\n")
+        f.write(f"Date Cleaned: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write("=" * 70 + "\n")
+        f.write("COLUMN DESCRIPTIONS\n")
+        f.write("=" * 70 + "\n\n")
+        for col in ordered:
+            f.write(f"{col:25s} → {COLUMN_DESCRIPTIONS.get(col, '(no description)')}\n")
+        f.write("\n" + "=" * 70 + "\n")
+        f.write("CLEANING NOTES\n")
+        f.write("=" * 70 + "\n\n")
+        f.write(f"1. Removed {stats['raw_rows'] - stats['rows']} players with less than 1 full match (90s < {MIN_90S})\n")
+        f.write(f"2. Recalculated npxG+xAG to fix {stats['npxg_fixed']} inconsistent values\n")
+        f.write("3. Created Primary_Pos column for simplified position analysis\n")
+        f.write(f"4. Added {derived_count} calculated columns for advanced analysis\n")
+        f.write(f"5. Kept {moved} players who moved between teams (same name, different teams)\n")
+        f.write(f"6. Retained all accented characters in player names ({stats['accented']} names, correct spellings)\n")
+        f.write(f"7. Final dataset: {stats['rows']} players across {len(stats['teams'])} Premier League teams\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a raw player export into the dashboard format.")
+    parser.add_argument('raw', nargs='?', default=RAW_FILE, help="raw player CSV")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="cleaned CSV to write")
+    parser.add_argument('--dictionary', default=DICTIONARY_FILE, help="data dictionary to write")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="raw rows per chunk")
+    args = parser.parse_args()
+
+    columns, stats = clean_file(args.raw, args.output, args.chunk_size)
+    write_data_dictionary(columns, stats, args.output, args.dictionary)
+
+    print(f"Original rows: {stats['raw_rows']}")
+    print(f"Cleaned rows: {stats['rows']}")
+    print(f"Cleaned data exported to: '{args.output}'")
+    print(f"Data dictionary saved to: '{args.dictionary}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import derived
+from metrics import with_metrics
+from team_aggregates import get_team_stats
+
+# Batched correlation engine for the team-level analysis.
+#
+# All metrics are correlated against the target in one matrix product, with
+# p-values from the t distribution computed for the whole vector at once
+# (the same two-sided test scipy.stats.pearsonr uses). scipy is imported only
+# when p-values are first computed, and only scipy.special - scipy.stats alone
+# costs the better part of a second of cold start.
+
+PEARSON = 'pearson'
+SPEARMAN = 'spearman'
+
+# Team metrics the dashboard and analyze_winrate.py report on
+CORRELATION_METRICS = {
+    'Gls_90': 'Goals per 90',
+    'Ast_90': 'Assists per 90',
+    'Contributions_90': 'Goal Contributions per 90',
+    'xG_90': 'Expected Goals per 90',
+    'xAG_90': 'Expected Assists per 90',
+    'Performance_vs_xG': 'Performance vs xG',
+    'Performance_vs_xAG': 'Performance vs xAG',
+    'PrgC': 'Progressive Carries',
+    'PrgP': 'Progressive Passes',
+}
+
+TARGET = 'Team_Win_Rate'
+
+
+def _prepare(values, method):
+    values = np.asarray(values, dtype=np.float64)
+    if method == SPEARMAN:
+        # Average ranks per column, as scipy.stats.rankdata (rows are NaN-free here)
+        values = pd.DataFrame(values).rank(axis=0).to_numpy()
+    elif method != PEARSON:
+        raise ValueError(f"Unknown correlation method: {method}")
+    return values
+
+
+def _residualize(values, controls):
+    # Remove the part of each column explained by the controls (plus intercept)
+    design = np.column_stack([np.ones(len(controls)), controls])
+    coefficients, *_ = np.linalg.lstsq(design, values, rcond=None)
+    return values - design @ coefficients
+
+
+def _standardize(values):
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / norms
+
+
+def p_values(r, dof):
+    """Two-sided p-values for correlation coefficients with `dof` degrees of freedom."""
+    from scipy.special import stdtr
+
+    r = np.clip(np.asarray(r, dtype=np.float64), -1.0, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(dof / (1.0 - r ** 2))
+    # Student t survival function: sf(|t|) == cdf(-|t|)
+    return 2 * stdtr(dof, -np.abs(t))
+
+
+def correlate(frame, metrics, target=TARGET, method=PEARSON, controls=(), aggregated=False):
+    """Correlate every metric with `target` in one pass.
+
+    With `controls`, returns partial correlations that hold those columns fixed.
+    Returns a frame indexed by metric with columns r, p_value and n. Registry
+    metrics (see metrics.py) are computed from the frame's columns; pass
+    `aggregated=True` for team stats, which keep their own columns.
+    """
+    metrics = list(metrics)
+    controls = list(controls)
+    columns = metrics + [target] + controls
+    data = with_metrics(frame, columns, aggregated)[columns].dropna()
+
+    values = _prepare(data[metrics + [target]].to_numpy(), method)
+    if controls:
+        values = _residualize(values, _prepare(data[controls].to_numpy(), method))
+
+    standardized = _standardize(values)
+    r = standardized[:, :-1].T @ standardized[:, -1]
+    dof = len(data) - 2 - len(controls)
+
+    return pd.DataFrame({'r': r, 'p_value': p_values(r, dof), 'n': len(data)}, index=pd.Index(metrics, name='Metric'))
+
+
+def correlation_matrix(frame, metrics, method=PEARSON, aggregated=False):
+    """Full metric-by-metric correlation and p-value matrices."""
+    metrics = list(metrics)
+    data = with_metrics(frame, metrics, aggregated)[metrics].dropna()
+    standardized = _standardize(_prepare(data.to_numpy(), method))
+    r = standardized.T @ standardized
+    np.fill_diagonal(r, 1.0)
+    return (pd.DataFrame(r, index=metrics, columns=metrics),
+            pd.DataFrame(p_values(r, len(data) - 2), index=metrics, columns=metrics))
+
+
+def significance_stars(p_value, none='NS'):
+    return np.select([p_value < 0.001, p_value < 0.01, p_value < 0.05], ['***', '**', '*'], none)
+
+
+def get_correlations(path, metrics=tuple(CORRELATION_METRICS), target=TARGET, method=PEARSON,
+                     controls=(), teams=None):
+    """Team-level correlations for the current version of `path`, cached per arguments.
+
+    `teams` optionally restricts the analysis to a subset of teams.
+    """
+    metrics, controls = tuple(metrics), tuple(controls)
+    teams = tuple(sorted(teams)) if teams is not None else None
+
+    def build(players):
+        team_stats = get_team_stats(path)
+        if teams is not None:
+            team_stats = team_stats[team_stats.index.get_level_values('Team').isin(teams)]
+        table = correlate(team_stats, metrics, target, method, controls, aggregated=True)
+        table['Significance'] = significance_stars(table['p_value'].to_numpy())
+        return table
+
+    return derived(path, ('correlations', metrics, target, method, controls, teams), build)
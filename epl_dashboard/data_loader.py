@@ -0,0 +1,507 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from snapshot import read_manifest, read_snapshot, snapshot_path
+from timing import span
+
+# Shared data-loading layer for the dashboard pages and the analysis scripts.
+# Parsed frames are cached per process, so every rerun of every session reuses
+# the same parse until the source file actually changes on disk. When a fresh
+# binary snapshot (see snapshot.py) sits next to the CSV it is memory-mapped
+# instead, and the CSV is only parsed as a fallback.
+#
+# There is one frame per dataset and process, shared by every session. It is
+# stored compactly (see compact()) on read-only arrays, and is never handed out
+# itself: load_players() and derived() give each caller a shallow copy. Columns
+# a session adds (filters, scores, projections) live only in its copy, on top
+# of the shared columns, and never cost a copy of the data they sit on; an
+# in-place write either fails loudly or, with pandas copy-on-write, lands in a
+# private copy of just that column.
+#
+# In the dashboard a background refresher (start_refresher()) watches the
+# loaded sources. When one changes it loads the new version and rebuilds every
+# derived view in use off the request path, then publishes them all in one
+# swap, so no rerun pays for the reload. Each rerun pins the versions it
+# first sees (pin_versions() / @pinned), so a swap halfway through a rerun
+# never mixes two versions on one page.
+#
+# Matchweek updates (see matchweek.py) are appended to a log next to the season
+# file instead of rewriting it. A load replays the log on top of the season
+# file; the process that ingests an update publishes the updated frame
+# directly (publish()), without reading anything back.
+
+# Explicit column types, so pandas doesn't have to infer them on every parse
+CATEGORY_COLUMNS = ['Nation', 'Team', 'Pos', 'Primary_Pos']
+
+INT_COLUMNS = ['MP', 'Starts']
+
+# Standings are empty for players whose team is missing from the standings
+# table (see add_win_rate.py), so these are nullable
+NULLABLE_INT_COLUMNS = ['Team_Position', 'Team_Points']
+
+FLOAT_COLUMNS = [
+    'Age', '90s', 'Gls', 'Ast', 'G+A', 'xG', 'xAG', 'npxG', 'npxG+xAG',
+    'PrgC', 'PrgP', 'CrdY', 'CrdR', 'Gls_90', 'Ast_90', 'xG_90', 'xAG_90',
+    'Contributions_90', 'xContributions_90', 'Performance_vs_xG',
+    'Performance_vs_xAG', 'Minutes_per_Goal', 'Minutes_per_Assist',
+    'Team_Win_Rate',
+]
+
+COLUMN_DTYPES = {
+    **{col: 'category' for col in CATEGORY_COLUMNS},
+    **{col: 'int64' for col in INT_COLUMNS},
+    **{col: 'Int64' for col in NULLABLE_INT_COLUMNS},
+    **{col: 'float64' for col in FLOAT_COLUMNS},
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+_derived = {}
+_derived_lock = threading.RLock()
+
+# Per-thread pinned entries (a rerun) and staged views (a background rebuild)
+_local = threading.local()
+
+# Seconds between checks of the loaded sources; 0 disables the refresher
+REFRESH_INTERVAL = float(os.environ.get('EPL_REFRESH_INTERVAL', '5'))
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+# Matchweek log next to a season file: players.csv -> players.matchweeks.csv
+MATCHWEEKS_SUFFIX = '.matchweeks.csv'
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(path):
+    """Cheap change check: (mtime in ns, size in bytes)."""
+    info = os.stat(path)
+    return info.st_mtime_ns, info.st_size
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_players(path):
+    """Parse a player CSV with explicit dtypes and stripped column names."""
+    # Map the stripped names back to the raw header so the dtypes still apply
+    # when the file has stray spaces around column names
+    raw_columns = pd.read_csv(path, nrows=0).columns
+    dtypes = {raw: COLUMN_DTYPES[raw.strip()]
+              for raw in raw_columns if raw.strip() in COLUMN_DTYPES}
+
+    df = pd.read_csv(path, dtype=dtypes)
+    df.columns = df.columns.str.strip()
+    return compact(df)
+
+
+def compact(df):
+    """Shrink a frame without changing any of its values.
+
+    Float columns become float32 when every value survives the round trip
+    (counts such as Gls or PrgP), integers take the smallest type that holds
+    them (nullable integers stay nullable only while they have gaps) and
+    strings become categoricals.
+    """
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            pass
+        elif pd.api.types.is_float_dtype(series):
+            narrow = series.astype('float32')
+            if narrow.astype('float64').equals(series):
+                series = narrow
+        elif pd.api.types.is_integer_dtype(series) and series.dtype.kind in 'iu':
+            if not isinstance(series.dtype, np.dtype) and not series.hasnans:
+                series = series.astype(series.dtype.numpy_dtype)
+            series = pd.to_numeric(series, downcast='integer')
+        elif not pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            series = series.astype('category')
+        data[col] = series
+    return pd.DataFrame(data, index=df.index)
+
+
+def _freeze(df):
+    """Rebuild `df` on read-only arrays, so writes into the shared frame fail loudly."""
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = np.asarray(series.array.codes)
+            codes.flags.writeable = False
+            data[col] = pd.Categorical.from_codes(codes, dtype=series.dtype, validate=False)
+        elif isinstance(series.dtype, np.dtype):
+            values = np.asarray(series.to_numpy())
+            values.flags.writeable = False
+            data[col] = values
+        else:
+            data[col] = series
+    return pd.DataFrame(data, index=df.index, copy=False)
+
+
+def matchweeks_path(path):
+    return os.path.splitext(path)[0] + MATCHWEEKS_SUFFIX
+
+
+def _source_signature(path):
+    # The CSV may be missing when only the snapshot was deployed
+    csv_signature = file_signature(path) if os.path.exists(path) else None
+    manifest_path = os.path.join(snapshot_path(path), 'manifest.json')
+    snapshot_signature = file_signature(manifest_path) if os.path.exists(manifest_path) else None
+    if csv_signature is None and snapshot_signature is None:
+        raise FileNotFoundError(path)
+    log_path = matchweeks_path(path)
+    log_signature = file_signature(log_path) if os.path.exists(log_path) else None
+    return csv_signature, snapshot_signature, log_signature
+
+
+def _combined_hash(season_hash, log_hash):
+    return hashlib.sha1(f"{season_hash}+{log_hash}".encode()).hexdigest()
+
+
+def _load_entry(path, csv_signature, previous):
+    manifest = read_manifest(snapshot_path(path))
+
+    if manifest is not None:
+        if csv_signature is None:
+            content_hash = manifest['source_hash']
+        elif manifest['source_signature'] == list(csv_signature):
+            # Snapshot was built from exactly this file - no need to hash it
+            content_hash = manifest['source_hash']
+        else:
+            with span('hash_source'):
+                content_hash = file_hash(path)
+
+        if content_hash == manifest['source_hash']:
+            if previous is not None and previous['hash'] == content_hash and previous['format'] == 'snapshot':
+                return previous
+            with span('read_snapshot'):
+                frame = read_snapshot(snapshot_path(path), manifest)
+            return {'frame': frame, 'hash': content_hash, 'format': 'snapshot'}
+    else:
+        with span('hash_source'):
+            content_hash = file_hash(path)
+
+    # Stale or missing snapshot - fall back to parsing the CSV
+    if previous is not None and previous['hash'] == content_hash and previous['format'] == 'csv':
+        return previous
+    with span('parse_csv'):
+        frame = _freeze(read_players(path))
+    return {'frame': frame, 'hash': content_hash, 'format': 'csv'}
+
+
+def _load(path, signature, previous):
+    # The season file (or its snapshot), then the matchweek log replayed on top
+    season_previous = previous.get('season', previous) if previous is not None else None
+    season = _load_entry(path, signature[0], season_previous)
+    if signature[2] is None:
+        return season
+
+    with span('hash_source'):
+        content_hash = _combined_hash(season['hash'], file_hash(matchweeks_path(path)))
+    if previous is not None and previous['hash'] == content_hash:
+        return previous
+    from matchweek import read_log, replay
+    with span('replay_matchweeks'):
+        frame = _freeze(replay(season['frame'], read_log(matchweeks_path(path))))
+    return {'frame': frame, 'hash': content_hash, 'format': f"{season['format']} + matchweeks",
+            'season': season}
+
+
+def _stamp(entry, previous, signature):
+    entry = dict(entry)
+    entry['signature'] = signature
+    if previous is not None and previous['hash'] == entry['hash']:
+        entry['generation'] = previous['generation']
+        entry['loaded_at'] = previous['loaded_at']
+    else:
+        # A new version of the data: count it and note when it arrived
+        entry['generation'] = previous['generation'] + 1 if previous is not None else 1
+        entry['loaded_at'] = time.time()
+    return entry
+
+
+def _resolve(path):
+    with _cache_lock:
+        entry = _cache.get(path)
+        # With the refresher running, changes are picked up in the background
+        if entry is not None and refresher_running():
+            return entry
+
+        signature = _source_signature(path)
+        if entry is not None and entry['signature'] == signature:
+            return entry
+
+        # mtime/size changed - only re-load if the content did too
+        entry = _stamp(_load(path, signature, entry), entry, signature)
+        _cache[path] = entry
+        return entry
+
+
+def _current(path):
+    path = os.path.abspath(path)
+    pins = getattr(_local, 'pins', None)
+    if pins is None:
+        return _resolve(path)
+    if path not in pins:
+        pins[path] = _resolve(path)
+    return pins[path]
+
+
+def pin_versions():
+    """Serve every dataset from the version first seen, until release_versions().
+
+    Call at the top of a page; a stale pin left by an interrupted rerun is dropped.
+    """
+    _local.pins = {}
+
+
+def release_versions():
+    _local.pins = None
+
+
+def pinned(func):
+    """Decorator for page fragments: pin versions for a fragment-only rerun.
+
+    Inside a full rerun the page's pins are kept.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'pins', None) is not None:
+            return func(*args, **kwargs)
+        pin_versions()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            release_versions()
+    return wrapper
+
+
+def load_players(path):
+    """Return the players of `path`, re-loading only when the source changed.
+
+    The result is a shallow copy of the shared frame: adding or replacing
+    columns on it is private to the caller, while the shared values themselves
+    are read-only.
+    """
+    return _current(path)['frame'].copy(deep=False)
+
+
+def load_info(path):
+    """Describe how `path` is currently loaded.
+
+    Returns the source format, content version, rows, and the generation (1 for
+    the first version loaded in this process, counting up on every reload) with
+    the time it was loaded.
+    """
+    entry = _current(path)
+    return {'format': entry['format'], 'version': entry['hash'][:12], 'rows': len(entry['frame']),
+            'generation': entry['generation'], 'loaded_at': entry['loaded_at']}
+
+
+def version_label(path):
+    """Short human-readable description of the version of `path` being served."""
+    info = load_info(path)
+    loaded = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info['loaded_at']))
+    return f"{info['version']} (reload #{info['generation']}, loaded {loaded})"
+
+
+def memory_report():
+    """Memory held by the shared frames, one row per loaded dataset."""
+    with _cache_lock:
+        entries = list(_cache.items())
+    rows = []
+    for path, entry in entries:
+        frame = entry['frame']
+        dtypes = frame.dtypes.astype(str)
+        rows.append({
+            'dataset': os.path.relpath(path),
+            'format': entry['format'],
+            'version': entry['hash'][:12],
+            'rows': len(frame),
+            'columns': len(frame.columns),
+            'float32_columns': int((dtypes == 'float32').sum()),
+            'category_columns': int((dtypes == 'category').sum()),
+            'memory_mb': round(frame.memory_usage(deep=True).sum() / 1024 ** 2, 3),
+        })
+    return pd.DataFrame(rows, columns=['dataset', 'format', 'version', 'rows', 'columns',
+                                       'float32_columns', 'category_columns', 'memory_mb'])
+
+
+def served_version(path):
+    """Version of `path` being served, or None if it isn't loaded.
+
+    Unlike data_version() this never checks the files or waits for a load in
+    progress, so it is only current while the refresher runs.
+    """
+    # A single dict lookup, safe without the lock
+    entry = _cache.get(os.path.abspath(path))
+    return None if entry is None else entry['hash'][:12]
+
+
+def data_version(path):
+    """Short content hash of the currently loaded version of `path`."""
+    return _current(path)['hash'][:12]
+
+
+def derived(path, name, build):
+    """Cache `build(frame)` for the current version of `path`.
+
+    Use this for views derived from a dataset (indexes, aggregates, model
+    outputs): they are built once per data version and shared by all sessions.
+    """
+    entry = _current(path)
+    version = entry['hash'][:12]
+    key = (os.path.abspath(path), name)
+    # Parameterised views are keyed by a tuple starting with their kind
+    label = f"build:{name[0] if isinstance(name, tuple) else name}"
+
+    staged = getattr(_local, 'staged', None)
+    if staged is not None:
+        # Background rebuild - collect the views, refresh() publishes them
+        if key not in staged:
+            with span(label):
+                staged[key] = (version, build(entry['frame'].copy(deep=False)), build)
+        return staged[key][1]
+
+    with _derived_lock:
+        cached = _derived.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with span(label):
+            value = build(entry['frame'].copy(deep=False))
+        # A rerun pinned to a version that has since been replaced doesn't
+        # overwrite the views of the new one
+        with _cache_lock:
+            published = _cache.get(key[0]) is entry
+        if published:
+            _derived[key] = (version, value, build)
+        return value
+
+
+def publish(path, frame, views=None):
+    """Serve `frame` as the current version of `path` after its matchweek log grew.
+
+    For updates applied in memory (see matchweek.ingest()): the version is
+    the same content hash a fresh load of the files would get, so nothing
+    needs to be read back. `views` maps derived view names to values already
+    updated for the new frame; they replace the old ones, and every other view
+    is rebuilt on first use. `path` must be loaded already, as ingest() does.
+    """
+    path = os.path.abspath(path)
+    with _cache_lock:
+        # Not _resolve(): it would see the grown log and replay all of it
+        previous = _cache.get(path)
+    if previous is None:
+        raise RuntimeError(f"{path} must be loaded before an update to it is published")
+    signature = _source_signature(path)
+    season = previous.get('season', previous)
+    content_hash = _combined_hash(season['hash'], file_hash(matchweeks_path(path)))
+    entry = _stamp({'frame': _freeze(frame), 'hash': content_hash,
+                    'format': f"{season['format']} + matchweeks", 'season': season}, previous, signature)
+
+    with _derived_lock, _cache_lock:
+        _cache[path] = entry
+        for name, value in (views or {}).items():
+            # Keep the build, so a later reload can still rebuild the view from scratch
+            old = _derived.get((path, name))
+            if old is not None:
+                _derived[(path, name)] = (content_hash[:12], value, old[2])
+    return entry['hash'][:12]
+
+
+def forget(path):
+    """Drop `path` and every view derived from it (for batch jobs going through many files)."""
+    path = os.path.abspath(path)
+    with _derived_lock, _cache_lock:
+        _cache.pop(path, None)
+        for key in [key for key in _derived if key[0] == path]:
+            del _derived[key]
+
+
+def refresh(path):
+    """Publish a new version of `path` if its source changed.
+
+    The new frame and every derived view built for the old version are built
+    first, then swapped in together. Returns True if a new version went live.
+    """
+    path = os.path.abspath(path)
+    signature = _source_signature(path)
+    with _cache_lock:
+        previous = _cache.get(path)
+    if previous is not None and previous['signature'] == signature:
+        return False
+
+    entry = _stamp(_load(path, signature, previous), previous, signature)
+    if _source_signature(path) != signature:
+        # Still being written - pick it up once it settles
+        return False
+    if previous is not None and entry['generation'] == previous['generation']:
+        # Touched or re-snapshotted, same content - the views still hold
+        with _cache_lock:
+            _cache[path] = entry
+        return False
+
+    with _derived_lock:
+        builds = [(key[1], value[2]) for key, value in _derived.items() if key[0] == path]
+
+    _local.pins = {path: entry}
+    _local.staged = {}
+    try:
+        for name, build in builds:
+            derived(path, name, build)
+        staged = _local.staged
+    finally:
+        _local.pins = None
+        _local.staged = None
+
+    with _derived_lock, _cache_lock:
+        _cache[path] = entry
+        _derived.update(staged)
+    logger.info("Reloaded %s: version %s (generation %d), %d views rebuilt",
+                path, entry['hash'][:12], entry['generation'], len(staged))
+    return True
+
+
+def _refresh_loop(interval):
+    while True:
+        time.sleep(interval)
+        with _cache_lock:
+            paths = list(_cache)
+        for path in paths:
+            try:
+                refresh(path)
+            except Exception:
+                # Keep serving the current version and try again next time
+                logger.exception("Reloading %s failed", path)
+
+
+def refresher_running():
+    return _refresher is not None and _refresher.is_alive()
+
+
+def start_refresher(interval=REFRESH_INTERVAL):
+    """Start the background reload thread (once per process; a no-op for interval 0)."""
+    global _refresher
+    if interval <= 0:
+        return
+    with _refresher_lock:
+        if not refresher_running():
+            _refresher = threading.Thread(target=_refresh_loop, args=(interval,),
+                                          name='data-refresher', daemon=True)
+            _refresher.start()
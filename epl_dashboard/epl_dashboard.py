@@ -1,7 +1,27 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+import timing
+from correlations import get_correlations
+from data_loader import (load_info, load_players, pin_versions, pinned, release_versions, start_refresher,
+                         version_label)
+from figure_cache import cached_figure
+from metrics import line_value
+from leaderboards import get_team_leaderboard
+from percentiles import POSITION, TEAM, get_percentile_index
+from player_index import get_player_index
+from resampling import CONFIDENCE, N_RESAMPLES, format_evidence, get_significance
+from season_store import list_partitions, partition_label, partition_path, query
+from similarity import get_similarity_index
+from team_aggregates import get_team_stats
+
+# Stage timings for this rerun (no-op unless EPL_TIMING=1, see timing.py)
+timing.start('dashboard', session_id=timing.session_id())
+
+# Changed data files are reloaded in the background (see data_loader.py); the
+# whole rerun is served from the versions current when it starts
+start_refresher()
+pin_versions()
 
 # Page configuration
 st.set_page_config(
@@ -39,18 +59,28 @@ st.markdown("""
 st.markdown('<h1 class="main-title">⚽ EPL DASHBOARD</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Player Statistics & Analysis</p>', unsafe_allow_html=True)
 
-# UPDATE THIS PATH TO YOUR CSV FILE LOCATION
+# Season selection - each competition/season is its own partition (see season_store.py)
+partitions = list(list_partitions())
+selected_partition = st.sidebar.selectbox(
+    "📅 Season", partitions, index=len(partitions) - 1, format_func=partition_label, key="season"
+)
+CSV_FILE_PATH = partition_path(*selected_partition)
 
-CSV_FILE_PATH = "premier_league_with_win_rate.csv"
 
-try:
-    # Load data directly from file
-    df = pd.read_csv(CSV_FILE_PATH)
-    
-    # Clean column names (remove any leading/trailing spaces)
-    df.columns = df.columns.str.strip()
-    
-    st.success(f"✅ Data loaded successfully! {len(df)} players found.")
+# Each section below is a fragment: a widget inside it reruns only that section,
+# so changing the player doesn't recompute the win-rate analysis and changing
+# the metric doesn't rebuild the player profile.
+#
+# Plotly is imported inside the figure builders, so a new worker starts sending
+# the page before it has loaded the charting stack (run_benchmarks.py --profile-startup
+# measures it).
+
+@st.fragment
+@timing.timed('dashboard:player_section')
+@pinned
+def player_section(csv_path):
+    """Team/player filters and the player profile."""
+    df = load_players(csv_path)
 
     # Filters Section
     st.markdown("---")
@@ -63,23 +93,34 @@ try:
         selected_team = st.selectbox("🏆 Select Team", ["All Teams"] + teams)
 
     # Filter players based on team selection
-    if selected_team == "All Teams":
-        filtered_df = df
-    else:
-        filtered_df = df[df['Team'] == selected_team]
+    filtered_df = query(path=csv_path, team=None if selected_team == "All Teams" else selected_team)
 
     with col2:
         # Player selection
         players = sorted(filtered_df['Player'].dropna().unique())
         selected_player = st.selectbox("👤 Select Player", players)
 
+    timing.note(team=selected_team, player=selected_player)
+
     # Display player information
     if selected_player:
         st.markdown("---")
         st.markdown(f"## 📊 Player Profile: **{selected_player}**")
 
-        # Get player data
-        player_data = filtered_df[filtered_df['Player'] == selected_player].iloc[0]
+        # Get player data (players who moved clubs can be viewed per club or combined)
+        player_index = get_player_index(csv_path)
+        if selected_team != "All Teams":
+            player_data = player_index.get(selected_team, selected_player)
+        elif player_index.is_transferred(selected_player):
+            club_options = player_index.teams(selected_player) + ["Combined"]
+            selected_club = st.radio("🔁 Played for more than one club this season",
+                                     club_options, index=len(club_options) - 1, horizontal=True)
+            if selected_club == "Combined":
+                player_data = player_index.merged(selected_player)
+            else:
+                player_data = player_index.get(selected_club, selected_player)
+        else:
+            player_data = player_index.rows(selected_player).iloc[0]
 
         # Basic Information
         st.markdown("### 📋 Basic Information")
@@ -148,19 +189,14 @@ try:
         st.markdown("### ⏱️ Efficiency Metrics")
         eff_col1, eff_col2, eff_col3, eff_col4 = st.columns(4)
 
+        # Missing (NaN) without a goal/assist (see metrics.py)
         with eff_col1:
-            mins_per_goal = player_data['Minutes_per_Goal']
-            if pd.notna(mins_per_goal) and mins_per_goal != float('inf'):
-                st.metric("⏱️ Minutes per Goal", f"{mins_per_goal:.0f}")
-            else:
-                st.metric("⏱️ Minutes per Goal", "N/A")
+            mins_per_goal = line_value(player_data, 'Minutes_per_Goal')
+            st.metric("⏱️ Minutes per Goal", "N/A" if pd.isna(mins_per_goal) else f"{mins_per_goal:.0f}")
 
         with eff_col2:
-            mins_per_assist = player_data['Minutes_per_Assist']
-            if pd.notna(mins_per_assist) and mins_per_assist != float('inf'):
-                st.metric("⏱️ Minutes per Assist", f"{mins_per_assist:.0f}")
-            else:
-                st.metric("⏱️ Minutes per Assist", "N/A")
+            mins_per_assist = line_value(player_data, 'Minutes_per_Assist')
+            st.metric("⏱️ Minutes per Assist", "N/A" if pd.isna(mins_per_assist) else f"{mins_per_assist:.0f}")
 
         with eff_col3:
             st.metric("🟨 Yellow Cards", int(player_data['CrdY']))
@@ -175,7 +211,15 @@ try:
 
         viz_col1, viz_col2 = st.columns(2)
 
-        with viz_col1:
+        # Figures are cached per dataset version and selection (see figure_cache.py)
+        if player_data.name is None:
+            player_key = ('combined', selected_player)
+        else:
+            player_key = ('row', player_data.name)
+
+        def build_goals_figure():
+            import plotly.graph_objects as go
+
             # Goals vs xG comparison
             fig_goals = go.Figure()
             fig_goals.add_trace(go.Bar(
@@ -190,9 +234,11 @@ try:
                 yaxis_title="Goals",
                 height=400
             )
-            st.plotly_chart(fig_goals, use_container_width=True)
+            return fig_goals
+
+        def build_assists_figure():
+            import plotly.graph_objects as go
 
-        with viz_col2:
             # Assists vs xAG comparison
             fig_assists = go.Figure()
             fig_assists.add_trace(go.Bar(
@@ -207,90 +253,122 @@ try:
                 yaxis_title="Assists",
                 height=400
             )
-            st.plotly_chart(fig_assists, use_container_width=True)
+            return fig_assists
+
+        with viz_col1:
+            fig_goals = cached_figure(csv_path, 'goals_vs_xg', player_key, build_goals_figure)
+            with timing.span('plotly_chart:goals_vs_xg'):
+                st.plotly_chart(fig_goals, use_container_width=True)
+
+        with viz_col2:
+            fig_assists = cached_figure(csv_path, 'assists_vs_xag', player_key, build_assists_figure)
+            with timing.span('plotly_chart:assists_vs_xag'):
+                st.plotly_chart(fig_assists, use_container_width=True)
 
         # Radar Chart - Overall Performance
         st.markdown("### 🎯 Performance Radar")
 
-        # Normalize metrics for radar chart (0-1 scale based on position)
-        position_group = filtered_df[filtered_df['Primary_Pos'] == player_data['Primary_Pos']]
-
+        # Percentile ranks within the player's position (and team, if one is selected)
         categories = ['Goals per 90', 'Assists per 90', 'xG per 90', 'xAG per 90', 'Progressive Actions']
+        radar_metrics = ['Gls_90', 'Ast_90', 'xG_90', 'xAG_90', 'Progressive_Actions']
+        scope = POSITION if selected_team == "All Teams" or player_data.name is None else TEAM
 
-        # Calculate percentile ranks
-        values = [
-            (position_group['Gls_90'] <= player_data['Gls_90']).mean() * 100,
-            (position_group['Ast_90'] <= player_data['Ast_90']).mean() * 100,
-            (position_group['xG_90'] <= player_data['xG_90']).mean() * 100,
-            (position_group['xAG_90'] <= player_data['xAG_90']).mean() * 100,
-            (position_group['PrgC'] + position_group['PrgP'] <= player_data['PrgC'] + player_data['PrgP']).mean() * 100
-        ]
-
-        fig_radar = go.Figure(data=go.Scatterpolar(
-            r=values,
-            theta=categories,
-            fill='toself',
-            fillcolor='rgba(56, 0, 60, 0.3)',
-            line=dict(color='#38003c', width=2)
-        ))
-
-        fig_radar.update_layout(
-            polar=dict(
-                radialaxis=dict(visible=True, range=[0, 100])
-            ),
-            title=f"{selected_player} - Percentile Ranks within {player_data['Primary_Pos']} Position",
-            height=500
-        )
+        def build_radar_figure():
+            import plotly.graph_objects as go
 
-        st.plotly_chart(fig_radar, use_container_width=True)
+            percentile_index = get_percentile_index(csv_path)
+            if player_data.name is None:
+                # Combined multi-club line - ranked league-wide within the position
+                values = percentile_index.percentiles_of(player_data, radar_metrics, POSITION,
+                                                         (player_data['Primary_Pos'],))
+            else:
+                values = percentile_index.batch([player_data.name], radar_metrics, scope=scope).iloc[0].tolist()
+
+            fig_radar = go.Figure(data=go.Scatterpolar(
+                r=values,
+                theta=categories,
+                fill='toself',
+                fillcolor='rgba(56, 0, 60, 0.3)',
+                line=dict(color='#38003c', width=2)
+            ))
 
-    # Win Rate Analysis Section
-    st.markdown("---")
-    st.markdown("---")
-    st.markdown("## 🏆 Does Player Performance Influence Team Win Rate?")
-    st.markdown("---")
+            fig_radar.update_layout(
+                polar=dict(
+                    radialaxis=dict(visible=True, range=[0, 100])
+                ),
+                title=f"{selected_player} - Percentile Ranks within {player_data['Primary_Pos']} Position",
+                height=500
+            )
+            return fig_radar
 
-    from scipy import stats
-
-    # Calculate team-level aggregated performance
-    team_stats = df.groupby('Team').agg({
-        'Team_Win_Rate': 'first',
-        'Team_Position': 'first',
-        'Team_Points': 'first',
-        'Contributions_90': 'mean',
-        'Gls_90': 'mean',
-        'Ast_90': 'mean',
-        'PrgP': 'mean',
-        'PrgC': 'mean',
-        'xG_90': 'mean',
-        'xAG_90': 'mean',
-        'Performance_vs_xG': 'mean',
-        'Performance_vs_xAG': 'mean'
-    }).round(3)
-
-    # Calculate correlations
-    corr_prgp, p_prgp = stats.pearsonr(team_stats['PrgP'], team_stats['Team_Win_Rate'])
-    corr_prgc, p_prgc = stats.pearsonr(team_stats['PrgC'], team_stats['Team_Win_Rate'])
-    corr_contrib, p_contrib = stats.pearsonr(team_stats['Contributions_90'], team_stats['Team_Win_Rate'])
+        fig_radar = cached_figure(csv_path, 'radar', (player_key, scope), build_radar_figure)
+        with timing.span('plotly_chart:radar'):
+            st.plotly_chart(fig_radar, use_container_width=True)
 
-    # Key Findings Section
-    st.markdown("### Key Findings")
+        # Only the selection is passed on: a fragment rerun reuses the arguments of
+        # the last full run, so the row itself is looked up again in the fragment
+        similar_players_section(csv_path, None if player_data.name is None else player_data['Team'],
+                                selected_player)
 
-    col1, col2, col3 = st.columns(3)
 
-    with col1:
-        st.metric("Strongest Factor", "Progressive Passes", delta=f"r = {corr_prgp:.3f}")
-        st.caption("Highest correlation with win rate")
+@st.fragment
+@timing.timed('dashboard:similar_players_section')
+@pinned
+def similar_players_section(csv_path, club, player):
+    """The players closest to the selected one by per-90 profile (see similarity.py).
 
-    with col2:
-        st.metric("Second Factor", "Progressive Carries", delta=f"r = {corr_prgc:.3f}")
-        st.caption("Also strongly correlates")
+    `club` is the team of the profiled line, or None for a combined multi-club line.
+    """
+    st.markdown("### 🔍 Similar Players")
 
-    with col3:
-        st.metric("Goal Contributions", "Highly Significant", delta=f"r = {corr_contrib:.3f}")
-        st.caption("Goals+Assists per 90")
+    player_index = get_player_index(csv_path)
+    if club is None:
+        player_data = player_index.merged(player) if not player_index.rows(player).empty else None
+    else:
+        player_data = player_index.get(club, player)
+    if player_data is None:
+        st.info(f"{player} is no longer in the data for this selection.")
+        return
+
+    df = load_players(csv_path)
+    min_age, max_age = int(df['Age'].min()), int(df['Age'].max())
+
+    sim_col1, sim_col2, sim_col3 = st.columns(3)
+
+    with sim_col1:
+        same_position = st.checkbox(f"Same position only ({player_data['Primary_Pos']})", value=True,
+                                    key="similar_same_position")
+    with sim_col2:
+        age_range = st.slider("Age range", min_age, max_age, (min_age, max_age), key="similar_age")
+    with sim_col3:
+        min_90s = st.slider("Minimum 90s played", 0.0, float(df['90s'].max()), 5.0, step=0.5,
+                            key="similar_min_90s")
+
+    with timing.span('similar_players'):
+        similar = get_similarity_index(csv_path).similar(
+            player_data,
+            position=player_data['Primary_Pos'] if same_position else None,
+            min_age=age_range[0],
+            max_age=age_range[1],
+            min_90s=min_90s,
+        )
 
-    st.markdown("---")
+    if similar.empty:
+        st.info("No players match these filters.")
+    else:
+        st.caption("Distance is measured in standard deviations across the per-90 profile - lower is more similar.")
+        st.dataframe(similar.reset_index(drop=True), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+@timing.timed('dashboard:metric_scatter_section')
+@pinned
+def metric_scatter_section(csv_path):
+    """Team scatter plot for the selected performance metric."""
+    # Loaded here rather than passed in: a fragment rerun reuses the arguments of
+    # the last full run, which may predate a refresh
+    team_stats = get_team_stats(csv_path)
+    correlation_table = get_correlations(csv_path)
 
     # Interactive Scatter Plot
     st.markdown("### Team Performance vs Win Rate")
@@ -308,33 +386,90 @@ try:
         list(metric_options.keys()),
         format_func=lambda x: metric_options[x]
     )
+    timing.note(metric=selected_metric)
 
-    # Calculate correlation for selected metric
-    corr, p_val = stats.pearsonr(team_stats[selected_metric], team_stats['Team_Win_Rate'])
+    # Correlation for selected metric
+    corr, p_val = correlation_table.loc[selected_metric, ['r', 'p_value']]
 
     # Create scatter plot
-    team_stats_reset = team_stats.reset_index()
-
-    fig_scatter = px.scatter(
-        team_stats_reset,
-        x=selected_metric,
-        y='Team_Win_Rate',
-        text='Team',
-        color='Team_Position',
-        size='Team_Points',
-        color_continuous_scale='RdYlGn_r',
-        title=f"{metric_options[selected_metric]} vs Win Rate (r={corr:.3f}, p={p_val:.4f})",
-        labels={
-            selected_metric: metric_options[selected_metric],
-            'Team_Win_Rate': 'Win Rate (%)',
-            'Team_Position': 'League Position'
-        }
-    )
+    def build_scatter_figure():
+        import plotly.express as px
+
+        # Teams missing from the standings have nothing to plot against
+        team_stats_reset = team_stats.reset_index().dropna(subset=['Team_Win_Rate', 'Team_Position',
+                                                                   'Team_Points'])
+
+        fig_scatter = px.scatter(
+            team_stats_reset,
+            x=selected_metric,
+            y='Team_Win_Rate',
+            text='Team',
+            color='Team_Position',
+            size='Team_Points',
+            color_continuous_scale='RdYlGn_r',
+            title=f"{metric_options[selected_metric]} vs Win Rate (r={corr:.3f}, p={p_val:.4f})",
+            labels={
+                selected_metric: metric_options[selected_metric],
+                'Team_Win_Rate': 'Win Rate (%)',
+                'Team_Position': 'League Position'
+            }
+        )
+
+        fig_scatter.update_traces(textposition='top center', textfont_size=9)
+        fig_scatter.update_layout(height=500)
+        return fig_scatter
 
-    fig_scatter.update_traces(textposition='top center', textfont_size=9)
-    fig_scatter.update_layout(height=500)
+    fig_scatter = cached_figure(csv_path, 'team_scatter', selected_metric, build_scatter_figure)
+    with timing.span('plotly_chart:team_scatter'):
+        st.plotly_chart(fig_scatter, use_container_width=True)
 
-    st.plotly_chart(fig_scatter, use_container_width=True)
+
+try:
+    # Load data (parsed once and cached until the file changes)
+    with timing.span('load_players'):
+        df = load_players(CSV_FILE_PATH)
+        source_format = load_info(CSV_FILE_PATH)['format']
+
+    st.success(f"✅ Data loaded successfully! {len(df)} players found (from {source_format}).")
+    st.sidebar.caption(f"🗂️ Data version {version_label(CSV_FILE_PATH)}")
+
+    player_section(CSV_FILE_PATH)
+
+    # Win Rate Analysis Section
+    st.markdown("---")
+    st.markdown("---")
+    st.markdown("## 🏆 Does Player Performance Influence Team Win Rate?")
+    st.markdown("---")
+
+    # Team-level aggregated performance (computed once per dataset version)
+    team_stats = get_team_stats(CSV_FILE_PATH)
+
+    # Correlation of every metric with win rate (one batched pass, cached per dataset version)
+    correlation_table = get_correlations(CSV_FILE_PATH)
+    corr_prgp, p_prgp = correlation_table.loc['PrgP', ['r', 'p_value']]
+    corr_prgc, p_prgc = correlation_table.loc['PrgC', ['r', 'p_value']]
+    corr_contrib, p_contrib = correlation_table.loc['Contributions_90', ['r', 'p_value']]
+
+    # Key Findings Section
+    st.markdown("### Key Findings")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Strongest Factor", "Progressive Passes", delta=f"r = {corr_prgp:.3f}")
+        st.caption("Highest correlation with win rate")
+
+    with col2:
+        st.metric("Second Factor", "Progressive Carries", delta=f"r = {corr_prgc:.3f}")
+        st.caption("Also strongly correlates")
+
+    with col3:
+        st.metric("Goal Contributions", "Highly Significant", delta=f"r = {corr_contrib:.3f}")
+        st.caption("Goals+Assists per 90")
+
+    st.markdown("---")
+
+    metric_scatter_section(CSV_FILE_PATH)
 
     st.markdown("---")
 
@@ -351,58 +486,70 @@ try:
         'xAG_90': 'Expected Assists per 90'
     }
 
-    correlations = []
-    for metric, name in metrics_to_analyze.items():
-        corr, p_val = stats.pearsonr(team_stats[metric], team_stats['Team_Win_Rate'])
-        sig = '***' if p_val < 0.001 else '**' if p_val < 0.01 else '*' if p_val < 0.05 else 'NS'
-        correlations.append({
-            'Metric': name,
-            'Correlation': corr,
-            'P-Value': p_val,
-            'Significance': sig
-        })
-
-    corr_df = pd.DataFrame(correlations).sort_values('Correlation', ascending=False)
-
-    fig_bar = px.bar(
-        corr_df,
-        x='Metric',
-        y='Correlation',
-        color='Correlation',
-        color_continuous_scale='RdYlGn',
-        title='Performance Metrics Correlation with Win Rate',
-        text='Significance'
-    )
+    corr_df = pd.DataFrame({
+        'Metric': list(metrics_to_analyze.values()),
+        'Correlation': correlation_table.loc[list(metrics_to_analyze), 'r'].to_numpy(),
+        'P-Value': correlation_table.loc[list(metrics_to_analyze), 'p_value'].to_numpy(),
+        'Significance': correlation_table.loc[list(metrics_to_analyze), 'Significance'].to_numpy()
+    }).sort_values('Correlation', ascending=False)
+
+    def build_correlation_figure():
+        import plotly.express as px
+
+        fig_bar = px.bar(
+            corr_df,
+            x='Metric',
+            y='Correlation',
+            color='Correlation',
+            color_continuous_scale='RdYlGn',
+            title='Performance Metrics Correlation with Win Rate',
+            text='Significance'
+        )
+
+        fig_bar.update_traces(textposition='outside')
+        fig_bar.update_layout(height=400, xaxis_tickangle=-45)
+        return fig_bar
 
-    fig_bar.update_traces(textposition='outside')
-    fig_bar.update_layout(height=400, xaxis_tickangle=-45)
+    fig_bar = cached_figure(CSV_FILE_PATH, 'correlation_bar', tuple(metrics_to_analyze), build_correlation_figure)
 
-    st.plotly_chart(fig_bar, use_container_width=True)
+    with timing.span('plotly_chart:correlation_bar'):
+        st.plotly_chart(fig_bar, use_container_width=True)
 
     st.markdown("---")
 
     # Top vs Bottom Comparison
     st.markdown("### Top 5 vs Bottom 5 Teams Comparison")
 
+    # Teams pre-sorted by win rate once per dataset version (see leaderboards.py)
+    team_leaderboard = get_team_leaderboard(CSV_FILE_PATH)
+    top_5 = team_leaderboard.top('Team_Win_Rate', 5)
+    bottom_5 = team_leaderboard.top('Team_Win_Rate', 5, ascending=True)
+
     col_top, col_bottom = st.columns(2)
 
     with col_top:
         st.markdown("**Top 5 Teams (by Win Rate)**")
-        top_teams = team_stats.nlargest(5, 'Team_Win_Rate')[['Team_Win_Rate', 'Contributions_90', 'PrgP']]
+        top_teams = top_5[['Team_Win_Rate', 'Contributions_90', 'PrgP']]
         top_teams.columns = ['Win Rate %', 'Contrib/90', 'Prog Passes']
         st.dataframe(top_teams, use_container_width=True)
 
     with col_bottom:
         st.markdown("**Bottom 5 Teams (by Win Rate)**")
-        bottom_teams = team_stats.nsmallest(5, 'Team_Win_Rate')[['Team_Win_Rate', 'Contributions_90', 'PrgP']]
+        bottom_teams = bottom_5[['Team_Win_Rate', 'Contributions_90', 'PrgP']]
         bottom_teams.columns = ['Win Rate %', 'Contrib/90', 'Prog Passes']
         st.dataframe(bottom_teams, use_container_width=True)
 
     # Calculate differences
-    top_5_avg_contrib = team_stats.nlargest(5, 'Team_Win_Rate')['Contributions_90'].mean()
-    bottom_5_avg_contrib = team_stats.nsmallest(5, 'Team_Win_Rate')['Contributions_90'].mean()
+    top_5_avg_contrib = top_5['Contributions_90'].mean()
+    bottom_5_avg_contrib = bottom_5['Contributions_90'].mean()
     pct_diff = ((top_5_avg_contrib - bottom_5_avg_contrib) / bottom_5_avg_contrib * 100)
 
+    # Bootstrap intervals and permutation p-values (cached per dataset version)
+    significance = get_significance(CSV_FILE_PATH)
+    key_metrics = significance.loc[['PrgP', 'PrgC', 'Contributions_90']]
+    max_key_p = key_metrics['permutation_p'].max()
+    all_intervals_positive = bool((key_metrics['ci_low'] > 0).all())
+
     # Conclusion
     st.markdown("---")
     st.markdown("### Conclusion")
@@ -411,9 +558,9 @@ try:
     **Answer: YES, player performance STRONGLY influences team win rate!**
 
     **Key Evidence:**
-    - Progressive Passes show the strongest correlation (r={corr_prgp:.3f}, p<0.001)
-    - Progressive Carries are also highly significant (r={corr_prgc:.3f}, p<0.001)
-    - Goal Contributions per 90 strongly predict success (r={corr_contrib:.3f}, p<0.001)
+    - Progressive Passes show the strongest correlation ({format_evidence(significance.loc['PrgP'])})
+    - Progressive Carries are also highly significant ({format_evidence(significance.loc['PrgC'])})
+    - Goal Contributions per 90 strongly predict success ({format_evidence(significance.loc['Contributions_90'])})
 
     **Impact:**
     - Top 5 teams average {top_5_avg_contrib:.3f} goal contributions per 90 minutes
@@ -421,17 +568,21 @@ try:
     - This represents a **{pct_diff:.1f}% difference** in attacking output
 
     **Statistical Significance:**
-    - All major performance metrics show p-values < 0.001 (highly significant)
-    - This means there's less than 0.1% chance these correlations are due to random chance
+    - Permutation tests ({N_RESAMPLES:,} shuffles of win rate) give p-values of at most {max_key_p:.4f} for these metrics
+    - Bootstrap {CONFIDENCE:.0%} intervals ({N_RESAMPLES:,} resamples of the {len(team_stats)} teams) {"all stay above zero" if all_intervals_positive else "do not all exclude zero"}
     """)
 
 except FileNotFoundError:
     st.error(f"❌ File not found: {CSV_FILE_PATH}")
     st.info("""
-    Please update the CSV_FILE_PATH variable at the top of the script with your file location.
+    Please add the season's players file under data/<competition>/<season>/ (see season_store.py).
     """)
 except Exception as e:
     st.error(f"❌ Error loading data: {str(e)}")
     st.info("Please check your CSV file format and path.")
 
+timing.debug_panel()
+timing.finish()
+release_versions()
+
 
@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+
+from data_loader import data_version
+from timing import span
+
+# Bounded LRU cache of rendered Plotly figures.
+#
+# Figures are keyed by (dataset version, figure kind, selection), so every
+# session looking at the same player/team/metric reuses one build. Entries hold
+# the serialized spec, taken once when the figure is built: st.plotly_chart
+# otherwise turns a figure back into a spec on every rerun, and a plain dict spec
+# would be re-validated property by property, which costs more than building
+# it. A cached entry is a figure that hands out that spec, so st.plotly_chart
+# only has to encode it. Cached figures are shared and frozen at build time, so
+# callers must not modify them.
+
+MAX_ENTRIES = 512
+
+
+class FigureCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, build):
+        """Return the cached figure for `key`, building it with `build()` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock so one slow figure doesn't block other sessions
+        figure = freeze(build())
+
+        with self._lock:
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return figure
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_frozen_class = None
+
+
+def freeze(figure):
+    """`figure` with its spec serialized once, for st.plotly_chart to reuse."""
+    global _frozen_class
+    if _frozen_class is None:
+        # plotly is imported by the first figure build, not when the pages load
+        import plotly.graph_objects as go
+
+        class FrozenFigure(go.Figure):
+            def __init__(self, figure):
+                super().__init__(figure)
+                self._spec = super().to_dict()
+
+            def to_dict(self):
+                return self._spec
+
+        _frozen_class = FrozenFigure
+    return _frozen_class(figure)
+
+
+# One cache per process, shared by all sessions and pages
+figure_cache = FigureCache()
+
+
+def cached_figure(path, kind, selection, build):
+    """Figure of `kind` for `selection` on the current version of `path`."""
+    with span(f'figure:{kind}'):
+        return figure_cache.get((data_version(path), kind, selection), build)
@@ -0,0 +1,93 @@
+import numpy as np
+
+from data_loader import derived
+from metrics import computed, metric_values
+from predictions import get_predictions
+from season_store import player_mask
+from team_aggregates import get_team_stats
+
+# Top-N lists from pre-sorted row orders.
+#
+# For every metric the leaderboard sorts the rows once per dataset version and
+# keeps the permutation (ties in row order, NaN dropped, exactly like
+# nlargest/nsmallest). A query then walks that order from the top, keeping the
+# rows that pass the filter mask, and stops as soon as it has N of them - so an
+# interaction costs the O(N) mask at most, never a sort. Metrics can be columns
+# of the frame or registry metrics (see metrics.py).
+
+TOP_N = 10
+
+
+class Leaderboard:
+    def __init__(self, frame, path=None, aggregated=False):
+        # With `path`, registry metrics are shared with the other views of the
+        # players; an aggregated frame (team stats) keeps its own columns
+        self.frame = frame
+        self.path = path
+        self.aggregated = aggregated
+        self._orders = {}
+
+    def order(self, metric, ascending=False):
+        """Row positions sorted by `metric` (best first), without NaN rows."""
+        key = (metric, ascending)
+        if key not in self._orders:
+            values = metric_values(self.frame, metric, self.path, self.aggregated)
+            valid = np.flatnonzero(~np.isnan(values))
+            # Stable sort keeps tied rows in frame order, as nlargest does
+            ranked = np.argsort(values[valid] if ascending else -values[valid], kind='stable')
+            self._orders[key] = valid[ranked]
+        return self._orders[key]
+
+    def mask(self, team=None, position=None, min_age=None, max_age=None, min_90s=None):
+        """Rows passing the filters (None means no filter), or None if nothing is filtered.
+
+        Same filters as season_store.query().
+        """
+        return player_mask(self.frame, team, position, min_90s, min_age, max_age)
+
+    def top_rows(self, metric, n=TOP_N, ascending=False, keep=None):
+        """Positions of the first `n` rows in `metric` order that pass `keep`."""
+        order = self.order(metric, ascending)
+        if keep is None:
+            return order[:n]
+
+        # Walk the order in growing blocks until n rows have passed the filter
+        found = []
+        count = 0
+        start = 0
+        block = max(4 * n, 256)
+        while count < n and start < len(order):
+            chunk = order[start:start + block]
+            chunk = chunk[keep[chunk]]
+            found.append(chunk)
+            count += len(chunk)
+            start += block
+            block *= 2
+        return np.concatenate(found)[:n] if found else order[:0]
+
+    def top(self, metric, n=TOP_N, ascending=False, **filters):
+        """The top `n` rows by `metric` (the bottom `n` with ascending=True) after filtering.
+
+        A registry metric is added to the rows as a column (replacing a stored one).
+        """
+        positions = self.top_rows(metric, n, ascending, self.mask(**filters))
+        rows = self.frame.iloc[positions]
+        if computed(self.frame, metric, self.aggregated):
+            rows = rows.assign(**{metric: metric_values(self.frame, metric, self.path)[positions]})
+        return rows
+
+
+def get_player_leaderboard(path):
+    """Leaderboard over the player rows of `path`, shared by all sessions."""
+    return derived(path, 'player_leaderboard', lambda players: Leaderboard(players, path))
+
+
+def get_team_leaderboard(path):
+    """Leaderboard over the team aggregates of `path`."""
+    return derived(path, 'team_leaderboard', lambda players: Leaderboard(get_team_stats(path), aggregated=True))
+
+
+def get_prediction_leaderboard(path, **params):
+    """Leaderboard over the 2025 projections of `path` (see predictions.py)."""
+    name = ('prediction_leaderboard', tuple(sorted(params.items())))
+    return derived(path, name, lambda players: Leaderboard(get_predictions(path, **params)))
@@ -0,0 +1,286 @@
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleaning import add_calculated_columns
+from data_loader import load_players, matchweeks_path, publish
+from player_index import PER_90_COLUMNS
+from team_aggregates import get_team_stats, refresh_teams
+from timing import run, span
+
+# Incremental matchweek ingestion.
+#
+# A matchweek arrives as delta rows, one per player and club that played:
+#   Player, Team, Minutes, Gls, Ast, xG, xAG, PrgC, PrgP, CrdY, CrdR
+# (optionally Starts and npxG, plus Nation, Pos and Age for players new to the
+# season). ingest() appends them to the season's matchweek log and applies them
+# to the loaded season: the totals of the touched rows go up, their per-90 and
+# calculated columns are recomputed (for those rows only), and the team
+# aggregates are recomputed only for the touched teams. Only the columns that
+# change are copied, and the season file is never rewritten - a fresh load
+# replays the log on top of it (see data_loader.py). `--compact` folds the log
+# into the season file when convenient.
+#
+#   python matchweek.py data/premier-league/2024-25/players.csv matchweek-07.csv
+#   python matchweek.py data/premier-league/2024-25/players.csv --compact
+
+KEY_COLUMNS = ['Team', 'Player']
+
+# Season totals a delta adds to
+TOTAL_COLUMNS = ['Starts', 'Gls', 'Ast', 'xG', 'xAG', 'npxG', 'PrgC', 'PrgP', 'CrdY', 'CrdR']
+
+# Identity columns a delta may carry for a player the season doesn't have yet
+IDENTITY_COLUMNS = ['Nation', 'Pos', 'Age']
+
+# Columns a batch rewrites at the touched rows: totals, per-90 and calculated columns
+CHANGED_COLUMNS = ['MP', '90s', 'G+A', 'npxG+xAG', *TOTAL_COLUMNS, *PER_90_COLUMNS,
+                   'Contributions_90', 'xContributions_90', 'Performance_vs_xG', 'Performance_vs_xAG',
+                   'Minutes_per_Goal', 'Minutes_per_Assist']
+
+# Team standings are copied from a teammate onto new players
+STANDINGS_COLUMNS = ['Team_Win_Rate', 'Team_Position', 'Team_Points']
+
+# Every ingested batch gets its own number in the log, so a replay applies the
+# batches one by one, exactly as they were applied when ingested
+UPDATE_COLUMN = 'Update'
+
+# Layout of the matchweek log (Matchweek is a free label, kept for reference)
+LOG_COLUMNS = [UPDATE_COLUMN, 'Matchweek'] + KEY_COLUMNS + ['Minutes'] + TOTAL_COLUMNS + IDENTITY_COLUMNS
+
+_ingest_lock = threading.Lock()
+
+
+def normalize_deltas(deltas):
+    """Check a frame of delta rows and fill the optional stat columns with 0."""
+    deltas = deltas.rename(columns=str.strip)
+    missing = [col for col in KEY_COLUMNS + ['Minutes'] if col not in deltas.columns]
+    if missing:
+        raise ValueError(f"Delta rows are missing columns: {', '.join(missing)}")
+    unknown = [col for col in deltas.columns if col not in LOG_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown delta columns: {', '.join(unknown)}")
+    if deltas['Minutes'].isna().any() or (deltas['Minutes'] < 0).any():
+        raise ValueError("Delta rows need non-negative Minutes")
+
+    deltas = deltas.copy()
+    for col in ['Minutes'] + TOTAL_COLUMNS:
+        deltas[col] = deltas[col].fillna(0).astype(np.float64) if col in deltas else 0.0
+    deltas['Team'] = deltas['Team'].astype(str).str.strip()
+    deltas['Player'] = deltas['Player'].astype(str).str.strip()
+    return deltas
+
+
+def _append_categories(categorical, values):
+    # New values go after the existing categories, so the old codes stay valid
+    values = pd.Index(values, dtype=object)
+    dtype = categorical.dtype
+    codes = dtype.categories.get_indexer(values)
+    unseen = (codes < 0) & values.notna()
+    if unseen.any():
+        added = values[unseen].unique()
+        codes[unseen] = len(dtype.categories) + added.get_indexer(values[unseen])
+        dtype = pd.CategoricalDtype(dtype.categories.append(pd.Index(added, dtype=dtype.categories.dtype)))
+    return pd.Categorical.from_codes(np.concatenate([categorical.codes, codes]), dtype=dtype, validate=False)
+
+
+def _add_players(players, new):
+    # Rows for players the season doesn't have yet, with zero totals; the delta
+    # is then applied to them like to anyone else. Team-level columns (the
+    # standings) come from a teammate. Adding rows copies every column, so a
+    # batch with new players costs more than one without.
+    details = [col for col in IDENTITY_COLUMNS if col in new]
+    identity = new.groupby(KEY_COLUMNS, sort=False)[details].first().reset_index()
+    first_rows = players['Team'].drop_duplicates().dropna()
+    teammate_of = pd.Series(first_rows.index, index=first_rows.astype(str).to_numpy())
+    unknown = identity.loc[~identity['Team'].isin(teammate_of.index), 'Team'].unique()
+    if len(unknown):
+        raise ValueError(f"Unknown teams: {', '.join(unknown)}")
+    if 'Pos' in identity:
+        identity['Primary_Pos'] = identity['Pos'].astype(str).str.split(',').str[0].where(identity['Pos'].notna())
+    teammates = players.loc[teammate_of.loc[identity['Team']].to_numpy()]
+
+    data = {}
+    for col in players.columns:
+        categorical = isinstance(players[col].dtype, pd.CategoricalDtype)
+        if col in identity:
+            values = identity[col]
+        elif col in IDENTITY_COLUMNS + ['Primary_Pos']:
+            values = pd.Series(np.nan, index=identity.index)
+        elif categorical or col in STANDINGS_COLUMNS:
+            values = teammates[col].astype(object if categorical else teammates[col].dtype)
+        else:
+            values = pd.Series(0, index=identity.index)
+
+        if categorical:
+            data[col] = _append_categories(players[col].array, values.to_numpy())
+        elif not isinstance(players[col].dtype, np.dtype):
+            # Nullable standings (teams missing from the standings table)
+            data[col] = pd.array(np.concatenate([players[col].to_numpy(dtype=object), values.to_numpy(dtype=object)]),
+                                 dtype=players[col].dtype)
+        else:
+            data[col] = np.concatenate([players[col].to_numpy(), values.to_numpy().astype(players[col].dtype)])
+    start = players.index.max() + 1 if len(players) else 0
+    return pd.DataFrame(data, index=players.index.append(pd.RangeIndex(start, start + len(identity))))
+
+
+def _row_positions(players, keys):
+    # Positions of (team, player) keys in `players`, -1 for unknown ones. The
+    # rows are matched on category codes packed into one integer per row.
+    team_codes = pd.Categorical(players['Team'])
+    player_codes = pd.Categorical(players['Player'])
+    wanted_teams = team_codes.categories.get_indexer(keys.get_level_values('Team'))
+    wanted_players = player_codes.categories.get_indexer(keys.get_level_values('Player'))
+    known = (wanted_teams >= 0) & (wanted_players >= 0)
+
+    width = len(player_codes.categories)
+    row_keys = team_codes.codes.astype(np.int64) * width + player_codes.codes
+    wanted = pd.Index(wanted_teams[known].astype(np.int64) * width + wanted_players[known])
+    # Each row looked up in the (small) table of wanted keys
+    matches = wanted.get_indexer(row_keys)
+    rows = np.flatnonzero(matches >= 0)
+
+    positions = np.full(len(keys), -1, dtype=np.int64)
+    positions[np.flatnonzero(known)[matches[rows]]] = rows
+    return positions
+
+
+def apply_deltas(players, deltas):
+    """Apply one batch of delta rows. Returns (updated players, touched teams).
+
+    Columns the batch doesn't change are shared with `players`; the changed
+    columns are copied once and updated at the touched rows only.
+    """
+    stats = deltas[['Minutes'] + TOTAL_COLUMNS].assign(Appearances=(deltas['Minutes'] > 0).astype(np.float64))
+    totals = stats.groupby([deltas['Team'], deltas['Player']], sort=False).sum()
+
+    positions = _row_positions(players, totals.index)
+    if (positions < 0).any():
+        new_keys = totals.index[positions < 0]
+        new = deltas.set_index(KEY_COLUMNS).loc[new_keys].reset_index()
+        players = _add_players(players, new)
+        positions = _row_positions(players, totals.index)
+
+    # The touched rows, updated as a small frame of the columns that change
+    changed = [col for col in CHANGED_COLUMNS if col in players]
+    touched = pd.DataFrame({col: players[col].to_numpy()[positions] for col in changed}, dtype=np.float64)
+    touched['MP'] += totals['Appearances'].to_numpy()
+    touched['90s'] += totals['Minutes'].to_numpy() / 90
+    for col in TOTAL_COLUMNS:
+        if col in touched:
+            touched[col] += totals[col].to_numpy()
+    touched['G+A'] = touched['Gls'] + touched['Ast']
+    if 'npxG+xAG' in touched:
+        touched['npxG+xAG'] = touched['npxG'] + touched['xAG']
+    nineties = touched['90s'].where(touched['90s'] > 0)
+    for col, total in PER_90_COLUMNS.items():
+        touched[col] = (touched[total] / nineties).round(2).fillna(0)
+    add_calculated_columns(touched)
+
+    columns = {}
+    for col in changed:
+        values = touched[col].to_numpy()
+        current = players[col].to_numpy()
+        if np.array_equal(values, current[positions]):
+            # Nothing to add (say, no red cards this week) - keep sharing it
+            continue
+        dtype = current.dtype
+        # Keep the column's type while the new values fit it (as compact() would)
+        if dtype.kind in 'iu':
+            values = np.round(values)
+            if values.max(initial=0) > np.iinfo(dtype).max:
+                dtype = np.int64
+        elif dtype == np.float32 and not np.array_equal(values.astype(np.float32), values):
+            dtype = np.float64
+        column = current.astype(dtype, copy=True)
+        column[positions] = values
+        columns[col] = column
+    updated = players.assign(**columns)
+    return updated, list(dict.fromkeys(totals.index.get_level_values('Team')))
+
+
+def read_log(path):
+    return pd.read_csv(path)
+
+
+def replay(players, log):
+    """Apply every batch of a matchweek log, in the order they were ingested."""
+    for _, batch in log.groupby(UPDATE_COLUMN, sort=False):
+        players, _ = apply_deltas(players, normalize_deltas(batch))
+    return players
+
+
+def _append_to_log(path, deltas):
+    log_path = matchweeks_path(path)
+    exists = os.path.exists(log_path)
+    deltas.reindex(columns=LOG_COLUMNS).to_csv(log_path, mode='a' if exists else 'w', header=not exists,
+                                               index=False)
+
+
+def ingest(path, deltas):
+    """Apply one matchweek of delta rows to the season at `path` and publish it.
+
+    Returns {'version', 'players', 'teams'} with the touched player rows and teams.
+    """
+    deltas = normalize_deltas(deltas)
+    with _ingest_lock:
+        # The current season and team view, before the log grows
+        players = load_players(path)
+        team_stats = get_team_stats(path)
+
+        with span('apply_deltas'):
+            updated, teams = apply_deltas(players, deltas)
+        with span('refresh_teams'):
+            team_stats = refresh_teams(team_stats, updated, teams)
+
+        deltas[UPDATE_COLUMN] = time.time_ns()
+        with span('append_log'):
+            _append_to_log(path, deltas)
+        version = publish(path, updated, {'team_stats': team_stats})
+    return {'version': version, 'players': deltas.groupby(KEY_COLUMNS).ngroups, 'teams': teams}
+
+
+def compact_log(path):
+    """Fold the matchweek log into the season file and remove the log."""
+    log_path = matchweeks_path(path)
+    if not os.path.exists(log_path):
+        return False
+    players = load_players(path)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    players.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    os.remove(log_path)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a matchweek of delta rows to a season's player file.")
+    parser.add_argument('season', help="season players file")
+    parser.add_argument('deltas', nargs='?', help="delta rows CSV (Player, Team, Minutes, Gls, Ast, ...)")
+    parser.add_argument('--compact', action='store_true', help="fold the matchweek log into the season file")
+    args = parser.parse_args()
+
+    if args.compact:
+        folded = compact_log(args.season)
+        print(f"Matchweek log folded into {args.season}." if folded else "No matchweek log to fold.")
+        return
+    if args.deltas is None:
+        parser.error("a deltas file is required unless --compact is given")
+
+    deltas = pd.read_csv(args.deltas)
+    # Warm the season first, so the timing is the update alone
+    load_players(args.season)
+    get_team_stats(os.path.abspath(args.season))
+    with run('matchweek', season=args.season):
+        started = time.perf_counter()
+        result = ingest(args.season, deltas)
+        elapsed = (time.perf_counter() - started) * 1000
+    print(f"Applied {len(deltas)} delta rows to {result['players']} players in {len(result['teams'])} teams "
+          f"in {elapsed:.1f}ms (version {result['version']}).")
+
+
+if __name__ == '__main__':
+    main()
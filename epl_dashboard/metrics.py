@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import derived
+
+# Derived metrics, declared once and computed on demand.
+#
+# A metric is a vectorized expression over base columns (or other metrics),
+# built from total(), difference(), ratio() and per_90(). Every ratio states what it gives
+# where its denominator is 0: ZERO for rates that are genuinely 0 there (no
+# cards in no minutes), MISSING (NaN) where there is no value - a player
+# without goals has no minutes per goal, so leaderboards and percentiles skip
+# the row instead of ranking a 0 or an inf. Nothing is stored: a metric
+# is computed when a view first asks for it, once per dataset version (through
+# derived()), and every view accepts these names wherever it takes a column.
+# A registered metric also takes the place of a stored column of the same name
+# (cleaning.py still writes e.g. Minutes_per_Goal, with 0 for "no goals").
+
+# What a ratio gives where its denominator is 0
+ZERO = 0.0
+MISSING = np.nan
+
+
+class Metric:
+    def __init__(self, description, expression, inputs):
+        self.description = description
+        self.expression = expression
+        self.inputs = inputs
+
+    def __call__(self, frame):
+        return self.expression(frame)
+
+
+def _operand(frame, operand):
+    # A column or metric name, or a tuple of them to add up
+    if isinstance(operand, tuple):
+        return sum(_operand(frame, part) for part in operand)
+    if operand in METRICS:
+        return METRICS[operand](frame)
+    return frame[operand].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _names(operand):
+    return list(operand) if isinstance(operand, tuple) else [operand]
+
+
+def total(description, *columns):
+    return Metric(description, lambda frame: _operand(frame, columns), list(columns))
+
+
+def difference(description, left, right):
+    return Metric(description, lambda frame: _operand(frame, left) - _operand(frame, right),
+                  _names(left) + _names(right))
+
+
+def ratio(description, numerator, denominator, scale=1.0, when_zero=MISSING):
+    def expression(frame):
+        top = _operand(frame, numerator) * scale
+        bottom = _operand(frame, denominator)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(bottom == 0, when_zero, top / bottom)
+    return Metric(description, expression, _names(numerator) + _names(denominator))
+
+
+def per_90(description, numerator, when_zero=ZERO):
+    # Same rule as the stored per-90 columns: 0 for players without minutes
+    return ratio(description, numerator, '90s', when_zero=when_zero)
+
+
+METRICS = {
+    'Progressive_Actions': total("Progressive carries and passes", 'PrgC', 'PrgP'),
+    'Cards': total("Yellow and red cards", 'CrdY', 'CrdR'),
+    'PrgC_90': per_90("Progressive carries per 90", 'PrgC'),
+    'PrgP_90': per_90("Progressive passes per 90", 'PrgP'),
+    'Progressive_Actions_90': per_90("Progressive actions per 90", 'Progressive_Actions'),
+    'npxG_90': per_90("Non-penalty expected goals per 90", 'npxG'),
+    'npxG+xAG_90': per_90("Non-penalty xG plus xAG per 90", 'npxG+xAG'),
+    'Cards_90': per_90("Cards per 90", 'Cards'),
+    # Sums of the source's per-90 columns, which are 0 without minutes (ZERO)
+    'Contributions_90': total("Goals plus assists per 90", 'Gls_90', 'Ast_90'),
+    'xContributions_90': total("xG plus xAG per 90", 'xG_90', 'xAG_90'),
+    'Performance_vs_xG': difference("Goals minus expected goals", 'Gls', 'xG'),
+    'Performance_vs_xAG': difference("Assists minus expected assists", 'Ast', 'xAG'),
+    'Minutes_per_Goal': ratio("Minutes per goal", '90s', 'Gls', scale=90, when_zero=MISSING),
+    'Minutes_per_Assist': ratio("Minutes per assist", '90s', 'Ast', scale=90, when_zero=MISSING),
+    'Minutes_per_Contribution': ratio("Minutes per goal or assist", '90s', 'G+A', scale=90, when_zero=MISSING),
+    'Goals_per_xG': ratio("Goals per expected goal (finishing)", 'Gls', 'xG'),
+    'Assists_per_xAG': ratio("Assists per expected assist", 'Ast', 'xAG'),
+    'Start_Rate': ratio("Share of appearances started (%)", 'Starts', 'MP', scale=100),
+}
+
+
+def computed(frame, name, aggregated=False):
+    """Whether `name` is a registry metric that can be computed from the columns of `frame`.
+
+    On player lines the registry takes the place of a stored column. Aggregated
+    frames (team stats, `aggregated=True`) keep theirs, as a squad average of a
+    metric is not the metric of the rounded averages.
+    """
+    if aggregated and name in frame.columns:
+        return False
+    return name in METRICS and all(col in frame.columns or computed(frame, col, aggregated)
+                                   for col in METRICS[name].inputs)
+
+
+def available(frame, aggregated=False):
+    """Registry metrics that can be computed from the columns of `frame`."""
+    return [name for name in METRICS if computed(frame, name, aggregated)]
+
+
+def is_metric(frame, name, aggregated=False):
+    return name in frame.columns or computed(frame, name, aggregated)
+
+
+def evaluate(frame, name):
+    """Values of registry metric `name` over `frame`, as a float64 array."""
+    if name not in METRICS:
+        raise KeyError(name)
+    return np.asarray(METRICS[name](frame), dtype=np.float64)
+
+
+def metric_values(frame, name, path=None, aggregated=False):
+    """Values of column or registry metric `name` for the rows of `frame`.
+
+    With `path`, `frame` is that dataset's player frame and registry metrics
+    are computed once per version and shared by every view.
+    """
+    if not computed(frame, name, aggregated):
+        return frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+    if path is None:
+        return evaluate(frame, name)
+    return derived(path, ('metric', name), lambda players: _shared(evaluate(players, name)))
+
+
+def line_value(line, name):
+    """Value of `name` for one player line (a row, or a merged multi-club line)."""
+    return metric_values(pd.DataFrame([line]), name)[0]
+
+
+def _shared(values):
+    values.flags.writeable = False
+    return values
+
+
+def with_metrics(frame, names, aggregated=False):
+    """`frame` with the registry metrics among `names` computed as columns."""
+    registered = [name for name in dict.fromkeys(names) if computed(frame, name, aggregated)]
+    if not registered:
+        return frame
+    return frame.assign(**{name: evaluate(frame, name) for name in registered})
+
+
+def descriptions():
+    return {name: metric.description for name, metric in METRICS.items()}
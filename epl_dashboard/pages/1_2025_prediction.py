@@ -1,175 +1,254 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 
-# UPDATE THIS PATH TO YOUR CSV FILE LOCATION
-CSV_FILE_PATH = "premier_league_cleaned.csv"  
+import timing
+from data_loader import (load_info, load_players, pin_versions, pinned, release_versions, start_refresher,
+                         version_label)
+from figure_cache import cached_figure
+from leaderboards import get_prediction_leaderboard
+from player_index import get_player_index
+from predictions import get_predictions
+from season_store import list_partitions, partition_label, partition_path, query
+from simulation import FORM_WEIGHT, N_SEASONS, RELEGATION_PLACES, TOP_PLACES, get_season_simulation
 
+# Stage timings for this rerun (no-op unless EPL_TIMING=1, see timing.py)
+timing.start('prediction', session_id=timing.session_id())
 
-try:
-    # Load data directly from file
-    df = pd.read_csv(CSV_FILE_PATH)
-    
-    # Clean column names (remove any leading/trailing spaces)
-    df.columns = df.columns.str.strip()
-    
-    st.success(f"✅ Data loaded successfully! {len(df)} players found.")
-    
-    # Filters Section
-    st.markdown("---")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Team selection
-        teams = sorted(df['Team'].dropna().unique())
-        selected_team = st.selectbox("🏆 Select Team", ["All Teams"] + teams)
-    
-    # Filter players based on team selection
-    if selected_team == "All Teams":
-        filtered_df = df
-    else:
-        filtered_df = df[df['Team'] == selected_team]
-    
-    with col2:
-        # Player selection
-        players = sorted(filtered_df['Player'].dropna().unique())
-        selected_player = st.selectbox("👤 Select Player", players)
-    
+# Changed data files are reloaded in the background (see data_loader.py); the
+# whole rerun is served from the versions current when it starts
+start_refresher()
+pin_versions()
 
-    st.markdown("## 🔮 2025 Season Predictions")
-    st.markdown("*Based on 2024 performance data and statistical trends*")
-    st.markdown("---")
-            
-        # Filters
+# Season selection - each competition/season is its own partition (see season_store.py)
+partitions = list(list_partitions())
+selected_partition = st.sidebar.selectbox(
+    "📅 Season", partitions, index=len(partitions) - 1, format_func=partition_label, key="season"
+)
+CSV_FILE_PATH = partition_path(*selected_partition)
+
+# Sections are fragments: a widget inside one reruns only that section, so
+# picking a player doesn't rebuild the top-10 table.
+
+@st.fragment
+@timing.timed('prediction:prediction_section')
+@pinned
+def prediction_section(csv_path):
+    """Team/player pickers and the 2025 projection for the selected player."""
+    df = load_players(csv_path)
+    predictions = get_predictions(csv_path)
+
+    # Filters
     col1, col2 = st.columns(2)
             
     with col1:
         teams = sorted(df['Team'].dropna().unique())
         pred_team = st.selectbox("🏆 Select Team", ["All Teams"] + teams, key="pred_team")
             
-    if pred_team == "All Teams":
-        pred_filtered_df = df
-    else:
-        pred_filtered_df = df[df['Team'] == pred_team]
+    pred_filtered_df = query(path=csv_path, team=None if pred_team == "All Teams" else pred_team)
             
     with col2:
         players = sorted(pred_filtered_df['Player'].dropna().unique())
         pred_player = st.selectbox("👤 Select Player", players, key="pred_player")
+
+    timing.note(team=pred_team, player=pred_player)
             
     if pred_player:
-        player_data = pred_filtered_df[pred_filtered_df['Player'] == pred_player].iloc[0]
+        # Players who moved clubs have a projection per club
+        player_index = get_player_index(csv_path)
+        if pred_team != "All Teams":
+            player_data = player_index.get(pred_team, pred_player)
+        elif player_index.is_transferred(pred_player):
+            pred_club = st.radio("🔁 Played for more than one club this season",
+                                 player_index.teams(pred_player), horizontal=True, key="pred_club")
+            player_data = player_index.get(pred_club, pred_player)
+        else:
+            player_data = player_index.rows(pred_player).iloc[0]
+        player_prediction = predictions.loc[player_data.name]
             
         st.markdown(f"### 📊 2025 Predictions for **{pred_player}**")
                 
-    # Calculate predictions based on current performance
-    # Assumptions: Similar playing time, age factor, regression to mean
-                
-    age_factor = 1.0
-    if player_data['Age'] < 24:
-        age_factor = 1.1  # Young players improving
-    elif player_data['Age'] > 30:
-        age_factor = 0.95  # Slight decline for older players
-                
-                # Calculate predicted stats
-    predicted_mp = int(player_data['MP'] * 0.95)  # Slightly conservative
-    predicted_goals = round(player_data['Gls_90'] * player_data['90s'] * age_factor)
-    predicted_assists = round(player_data['Ast_90'] * player_data['90s'] * age_factor)
-    predicted_xg = round(player_data['xG_90'] * player_data['90s'] * age_factor, 2)
-    predicted_xag = round(player_data['xAG_90'] * player_data['90s'] * age_factor, 2)
-                
-                # Display predictions
-    st.markdown('<div class="prediction-box">', unsafe_allow_html=True)
-                
-    pred_col1, pred_col2, pred_col3, pred_col4 = st.columns(4)
-                
-    with pred_col1:
-        st.metric(
-            "Predicted Goals 2025",
-            f"{predicted_goals}",
-            delta=f"{predicted_goals - int(player_data['Gls'])} vs 2024"
-        )
-                
-    with pred_col2:
-        st.metric(
-            "Predicted Assists 2025",
-            f"{predicted_assists}",
-            delta=f"{predicted_assists - int(player_data['Ast'])} vs 2024"
-        )
-                
-    with pred_col3:
-        st.metric(
-            "Predicted xG 2025",
-            f"{predicted_xg:.1f}",
-            delta=f"{predicted_xg - player_data['xG']:.1f} vs 2024"
-        )
-                
-    with pred_col4:
-        st.metric(
-            "Predicted xAG 2025",
-            f"{predicted_xag:.1f}",
-            delta=f"{predicted_xag - player_data['xAG']:.1f} vs 2024"
-        )
-                
-    st.markdown('</div>', unsafe_allow_html=True)
-                
-    st.markdown("---")
-                
-    # Prediction Chart
-    st.markdown("### 📈 2024 vs 2025 Projection")
-                
-    comparison_data = {
-        'Metric': ['Goals', 'Goals', 'Assists', 'Assists', 'xG', 'xG', 'xAG', 'xAG'],
-        'Season': ['2024', '2025', '2024', '2025', '2024', '2025', '2024', '2025'],
-        'Value': [
-            player_data['Gls'], predicted_goals,
-            player_data['Ast'], predicted_assists,
-            player_data['xG'], predicted_xg,
-            player_data['xAG'], predicted_xag
-        ]
-    }
-                
-    fig_prediction = px.bar(
-        comparison_data,
-        x='Metric',
-        y='Value',
-        color='Season',
-        barmode='group',
-        title=f"{pred_player} - 2024 Performance vs 2025 Predictions",
-        color_discrete_map={'2024': '#38003c', '2025': '#00ff87'}
+        # Predictions based on current performance (see predictions.py)
+        # Assumptions: Similar playing time, age factor, regression to mean
+        age_factor = player_prediction['Age_Factor']
+        predicted_goals = int(player_prediction['Predicted_Goals_2025'])
+        predicted_assists = int(player_prediction['Predicted_Assists_2025'])
+        predicted_xg = player_prediction['Predicted_xG_2025']
+        predicted_xag = player_prediction['Predicted_xAG_2025']
+
+        # Display predictions
+        st.markdown('<div class="prediction-box">', unsafe_allow_html=True)
+
+        pred_col1, pred_col2, pred_col3, pred_col4 = st.columns(4)
+
+        with pred_col1:
+            st.metric(
+                "Predicted Goals 2025",
+                f"{predicted_goals}",
+                delta=f"{predicted_goals - int(player_data['Gls'])} vs 2024"
+            )
+
+        with pred_col2:
+            st.metric(
+                "Predicted Assists 2025",
+                f"{predicted_assists}",
+                delta=f"{predicted_assists - int(player_data['Ast'])} vs 2024"
+            )
+
+        with pred_col3:
+            st.metric(
+                "Predicted xG 2025",
+                f"{predicted_xg:.1f}",
+                delta=f"{predicted_xg - player_data['xG']:.1f} vs 2024"
+            )
+
+        with pred_col4:
+            st.metric(
+                "Predicted xAG 2025",
+                f"{predicted_xag:.1f}",
+                delta=f"{predicted_xag - player_data['xAG']:.1f} vs 2024"
+            )
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        st.markdown("---")
+
+        # Prediction Chart
+        st.markdown("### 📈 2024 vs 2025 Projection")
+
+        # Cached per dataset version and player row (see figure_cache.py)
+        def build_prediction_figure():
+            # Deferred so the page starts rendering before plotly is loaded
+            import plotly.express as px
+
+            comparison_data = {
+                'Metric': ['Goals', 'Goals', 'Assists', 'Assists', 'xG', 'xG', 'xAG', 'xAG'],
+                'Season': ['2024', '2025', '2024', '2025', '2024', '2025', '2024', '2025'],
+                'Value': [
+                    player_data['Gls'], predicted_goals,
+                    player_data['Ast'], predicted_assists,
+                    player_data['xG'], predicted_xg,
+                    player_data['xAG'], predicted_xag
+                ]
+            }
+
+            fig_prediction = px.bar(
+                comparison_data,
+                x='Metric',
+                y='Value',
+                color='Season',
+                barmode='group',
+                title=f"{pred_player} - 2024 Performance vs 2025 Predictions",
+                color_discrete_map={'2024': '#38003c', '2025': '#00ff87'}
+            )
+            fig_prediction.update_layout(height=500)
+            return fig_prediction
+
+        fig_prediction = cached_figure(csv_path, 'prediction_comparison', player_data.name, build_prediction_figure)
+        with timing.span('plotly_chart:prediction_comparison'):
+            st.plotly_chart(fig_prediction, use_container_width=True)
+
+        # Prediction methodology
+        st.markdown("---")
+        st.markdown("### 📌 Prediction Methodology")
+        st.info(f"""
+        **Factors considered:**
+        - **Age Factor:** {age_factor}x ({"Improving 🔥" if age_factor > 1 else "Stable ⚖️" if age_factor == 1 else "Slight decline 📉"})
+        - **Current per-90 metrics:** Goals/90: {player_data['Gls_90']:.2f}, Assists/90: {player_data['Ast_90']:.2f}
+        - **Expected playing time:** ~{player_data['90s']:.1f} x 90-minute matches
+        - **Performance consistency:** Based on xG/xAG alignment
+
+        *Note: Predictions assume similar playing time, no major injuries, and current team structure.*
+        """)
+
+
+@st.fragment
+@timing.timed('prediction:simulation_section')
+@pinned
+def simulation_section(csv_path):
+    """Simulated 2025 table: expected points, title/top-4/relegation odds and final positions."""
+    st.markdown("### 🏁 2025 Table Simulation")
+    st.markdown("*Every fixture of the season played out as Poisson goal counts from team strength "
+                "(squad xG + xAG per 90 and last season's win rate), many times over*")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        n_seasons = st.select_slider("🎲 Simulated seasons", [10_000, 50_000, N_SEASONS], value=10_000,
+                                     format_func=lambda n: f"{n:,}", key="sim_seasons")
+    with col2:
+        form_weight = st.slider("📅 Weight of last season's results", 0.0, 1.0, FORM_WEIGHT, step=0.25,
+                                key="sim_form_weight")
+
+    timing.note(n_seasons=n_seasons, form_weight=form_weight)
+
+    # Simulated once per dataset version and setting (see simulation.py)
+    with timing.span('season_simulation'):
+        simulation = get_season_simulation(csv_path, n_seasons=n_seasons, form_weight=form_weight)
+
+    top_column = f'Top_{TOP_PLACES}'
+    table = simulation[['Expected_Points', 'Points_P10', 'Points_P90', 'Expected_Position',
+                        'Title', top_column, 'Relegation']].reset_index()
+    table.index = table.index + 1
+    st.dataframe(
+        table,
+        use_container_width=True,
+        column_config={
+            "Expected_Points": st.column_config.NumberColumn("Expected Points", format="%.1f"),
+            "Points_P10": st.column_config.NumberColumn("Points (10th pct)", format="%d"),
+            "Points_P90": st.column_config.NumberColumn("Points (90th pct)", format="%d"),
+            "Expected_Position": st.column_config.NumberColumn("Expected Position", format="%.1f"),
+            "Title": st.column_config.ProgressColumn("Title", format="percent", min_value=0, max_value=1),
+            top_column: st.column_config.ProgressColumn(f"Top {TOP_PLACES}", format="percent",
+                                                        min_value=0, max_value=1),
+            "Relegation": st.column_config.ProgressColumn(f"Bottom {RELEGATION_PLACES}", format="percent",
+                                                          min_value=0, max_value=1),
+        }
     )
-    fig_prediction.update_layout(height=500)
-    st.plotly_chart(fig_prediction, use_container_width=True)
-                
-    # Prediction methodology
+
+    def build_positions_figure():
+        import plotly.express as px
+
+        # One column per final position, 1..number of teams
+        positions = simulation[list(range(1, len(simulation) + 1))]
+        fig_positions = px.imshow(
+            positions * 100,
+            labels=dict(x="Final Position", y="Team", color="Probability (%)"),
+            color_continuous_scale=[[0, '#ffffff'], [1, '#38003c']],
+            aspect='auto',
+            title="Final Position Probabilities",
+        )
+        fig_positions.update_xaxes(dtick=1)
+        fig_positions.update_layout(height=600)
+        return fig_positions
+
+    fig_positions = cached_figure(csv_path, 'simulated_positions', (n_seasons, form_weight), build_positions_figure)
+    with timing.span('plotly_chart:simulated_positions'):
+        st.plotly_chart(fig_positions, use_container_width=True)
+
+
+try:
+    # Load data (parsed once and cached until the file changes)
+    with timing.span('load_players'):
+        df = load_players(CSV_FILE_PATH)
+        # 2025 projections for every player, computed once per dataset version
+        predictions = get_predictions(CSV_FILE_PATH)
+        source_format = load_info(CSV_FILE_PATH)['format']
+
+    st.success(f"✅ Data loaded successfully! {len(df)} players found (from {source_format}).")
+    st.sidebar.caption(f"🗂️ Data version {version_label(CSV_FILE_PATH)}")
+
+    st.markdown("## 🔮 2025 Season Predictions")
+    st.markdown("*Based on 2024 performance data and statistical trends*")
     st.markdown("---")
-    st.markdown("### 📌 Prediction Methodology")
-    st.info(f"""
-    **Factors considered:**
-    - **Age Factor:** {age_factor}x ({"Improving 🔥" if age_factor > 1 else "Stable ⚖️" if age_factor == 1 else "Slight decline 📉"})
-    - **Current per-90 metrics:** Goals/90: {player_data['Gls_90']:.2f}, Assists/90: {player_data['Ast_90']:.2f}
-    - **Expected playing time:** ~{player_data['90s']:.1f} x 90-minute matches
-    - **Performance consistency:** Based on xG/xAG alignment
-                
-    *Note: Predictions assume similar playing time, no major injuries, and current team structure.*
-    """)
+            
+    prediction_section(CSV_FILE_PATH)
+
                 
     # Top predicted performers
     st.markdown("---")
     st.markdown("### 🏆 Top 10 Predicted Performers for 2025")
                 
-    # Calculate predictions for all players
-    df['Predicted_Goals_2025'] = df.apply(
-        lambda x: round(x['Gls_90'] * x['90s'] * (1.1 if x['Age'] < 24 else 0.95 if x['Age'] > 30 else 1.0)), 
-        axis=1
-    )
-    df['Predicted_Assists_2025'] = df.apply(
-        lambda x: round(x['Ast_90'] * x['90s'] * (1.1 if x['Age'] < 24 else 0.95 if x['Age'] > 30 else 1.0)), 
-        axis=1
-    )
-    df['Predicted_GA_2025'] = df['Predicted_Goals_2025'] + df['Predicted_Assists_2025']
-                
-    top_predicted = df.nlargest(10, 'Predicted_GA_2025')[['Player', 'Team', 'Age', 'Predicted_Goals_2025', 'Predicted_Assists_2025', 'Predicted_GA_2025']]
+    # Projections are pre-sorted once per dataset version (see leaderboards.py)
+    with timing.span('top_predicted'):
+        top_predicted = get_prediction_leaderboard(CSV_FILE_PATH).top('Predicted_GA_2025', 10)[['Player', 'Team', 'Age', 'Predicted_Goals_2025', 'Predicted_Assists_2025', 'Predicted_GA_2025']]
                 
     st.dataframe(
         top_predicted.reset_index(drop=True),
@@ -184,14 +263,21 @@ try:
         }
     )
 
+    st.markdown("---")
+    simulation_section(CSV_FILE_PATH)
+
 
 
 except FileNotFoundError:
     st.error(f"❌ File not found: {CSV_FILE_PATH}")
     st.info("""
-    Please update the CSV_FILE_PATH variable at the top of the script with your file location.
+    Please add the season's players file under data/<competition>/<season>/ (see season_store.py).
     """)
 except Exception as e:
     st.error(f"❌ Error loading data: {str(e)}")
     st.info("Please check your CSV file format and path.")
 
+timing.debug_panel()
+timing.finish()
+release_versions()
+
@@ -0,0 +1,127 @@
+import streamlit as st
+import pandas as pd
+
+import timing
+from cleaning import COLUMN_DESCRIPTIONS
+from data_loader import (load_info, load_players, pin_versions, pinned, release_versions, start_refresher,
+                         version_label)
+from leaderboards import get_player_leaderboard
+from metrics import available, descriptions
+from season_store import list_partitions, partition_label, partition_path
+
+# Stage timings for this rerun (no-op unless EPL_TIMING=1, see timing.py)
+timing.start('league_leaders', session_id=timing.session_id())
+
+# Changed data files are reloaded in the background (see data_loader.py); the
+# whole rerun is served from the versions current when it starts
+start_refresher()
+pin_versions()
+
+# Season selection - each competition/season is its own partition (see season_store.py)
+partitions = list(list_partitions())
+selected_partition = st.sidebar.selectbox(
+    "📅 Season", partitions, index=len(partitions) - 1, format_func=partition_label, key="season"
+)
+CSV_FILE_PATH = partition_path(*selected_partition)
+
+# Columns shown next to the metric in every leaderboard
+LEADER_COLUMNS = ['Player', 'Team', 'Primary_Pos', 'Age', '90s']
+
+
+@st.fragment
+@timing.timed('league_leaders:leaderboard_section')
+@pinned
+def leaderboard_section(csv_path):
+    """Metric and filter pickers and the resulting leaderboard."""
+    df = load_players(csv_path)
+
+    # Every numeric stat in the data dictionary can be ranked, and every registry
+    # metric (see metrics.py) - computed the first time someone picks it
+    metric_descriptions = {**COLUMN_DESCRIPTIONS, **descriptions()}
+    metrics = [col for col in COLUMN_DESCRIPTIONS
+               if col in df.columns and col not in LEADER_COLUMNS and pd.api.types.is_numeric_dtype(df[col])]
+    metrics += [name for name in available(df) if name not in metrics]
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        metric = st.selectbox("📊 Metric", metrics, index=metrics.index('Gls') if 'Gls' in metrics else 0,
+                              format_func=lambda col: f"{metric_descriptions[col]} ({col})", key="leaders_metric")
+    with col2:
+        teams = sorted(df['Team'].dropna().unique())
+        team = st.selectbox("🏆 Team", ["All Teams"] + teams, key="leaders_team")
+    with col3:
+        positions = sorted(df['Primary_Pos'].dropna().unique())
+        position = st.selectbox("📍 Position", ["All Positions"] + positions, key="leaders_position")
+
+    col4, col5, col6 = st.columns(3)
+
+    with col4:
+        min_age, max_age = int(df['Age'].min()), int(df['Age'].max())
+        age_range = st.slider("🎂 Age band", min_age, max_age, (min_age, max_age), key="leaders_age")
+    with col5:
+        min_90s = st.slider("⏱️ Minimum 90s played", 0.0, float(df['90s'].max()), 0.0, step=0.5,
+                            key="leaders_min_90s")
+    with col6:
+        top_n = st.slider("Number of players", 5, 50, 10, step=5, key="leaders_n")
+        lowest = st.toggle("Lowest first", value=False, key="leaders_lowest")
+
+    timing.note(metric=metric, team=team, position=position)
+
+    with timing.span('leaderboard'):
+        leaders = get_player_leaderboard(csv_path).top(
+            metric,
+            top_n,
+            ascending=lowest,
+            team=None if team == "All Teams" else team,
+            position=None if position == "All Positions" else position,
+            min_age=age_range[0],
+            max_age=age_range[1],
+            min_90s=min_90s if min_90s > 0 else None,
+        )
+
+    if leaders.empty:
+        st.info("No players match these filters.")
+        return
+
+    table = leaders[LEADER_COLUMNS + [metric]].reset_index(drop=True)
+    table.index = table.index + 1
+    st.dataframe(
+        table,
+        use_container_width=True,
+        column_config={
+            "Player": "Player Name",
+            "Primary_Pos": "Position",
+            "Age": st.column_config.NumberColumn("Age", format="%d"),
+            metric: metric_descriptions[metric],
+        }
+    )
+
+
+try:
+    st.markdown("## 🥇 League Leaders")
+    st.markdown("*Top players for any stat, by team, position, age band and playing time*")
+
+    # Load data (parsed once and cached until the file changes)
+    with timing.span('load_players'):
+        df = load_players(CSV_FILE_PATH)
+        source_format = load_info(CSV_FILE_PATH)['format']
+
+    st.success(f"✅ Data loaded successfully! {len(df)} players found (from {source_format}).")
+    st.sidebar.caption(f"🗂️ Data version {version_label(CSV_FILE_PATH)}")
+    st.markdown("---")
+
+    leaderboard_section(CSV_FILE_PATH)
+
+except FileNotFoundError:
+    st.error(f"❌ File not found: {CSV_FILE_PATH}")
+    st.info("""
+    Please add the season's players file under data/<competition>/<season>/ (see season_store.py).
+    """)
+except Exception as e:
+    st.error(f"❌ Error loading data: {str(e)}")
+    st.info("Please check your CSV file format and path.")
+
+timing.debug_panel()
+timing.finish()
+release_versions()
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import derived
+from metrics import line_value, metric_values
+
+# Percentile ranks backed by sorted value arrays.
+#
+# For every (scope group, metric) the index keeps the metric's values sorted
+# once, so a percentile is a binary search instead of a comparison against the
+# whole group. Percentiles use the same definition as before: the share of the
+# group with a value <= the player's value, in percent.
+
+# Scopes a rank can be taken in
+LEAGUE = 'league'        # all players
+POSITION = 'position'    # same primary position, league-wide
+TEAM = 'team'            # same primary position within the player's team
+
+SCOPE_COLUMNS = {
+    LEAGUE: [],
+    POSITION: ['Primary_Pos'],
+    TEAM: ['Team', 'Primary_Pos'],
+}
+
+
+class PercentileIndex:
+    def __init__(self, players, path=None):
+        # With `path`, registry metrics (see metrics.py) are shared with other views
+        self.players = players
+        self.path = path
+        self._values = {}
+        self._groups = {}
+        self._sorted = {}
+
+    def metric_values(self, metric):
+        if metric not in self._values:
+            self._values[metric] = metric_values(self.players, metric, self.path)
+        return self._values[metric]
+
+    def _group_rows(self, scope):
+        # Row positions of each group in the scope, e.g. {('MF',): array([...])}
+        if scope not in self._groups:
+            columns = SCOPE_COLUMNS[scope]
+            if columns:
+                grouped = self.players.groupby(columns, observed=True, sort=False).indices
+                self._groups[scope] = {key if isinstance(key, tuple) else (key,): rows
+                                       for key, rows in grouped.items()}
+            else:
+                self._groups[scope] = {(): np.arange(len(self.players))}
+        return self._groups[scope]
+
+    def sorted_values(self, metric, scope=POSITION, group=()):
+        """Sorted non-NaN values of `metric` in one group, plus the group size."""
+        key = (scope, tuple(group), metric)
+        if key not in self._sorted:
+            rows = self._group_rows(scope).get(tuple(group), np.array([], dtype=np.intp))
+            values = self.metric_values(metric)[rows]
+            self._sorted[key] = (np.sort(values[~np.isnan(values)]), len(rows))
+        return self._sorted[key]
+
+    def percentile(self, value, metric, scope=POSITION, group=()):
+        """Percentile of a single value within one group."""
+        sorted_values, size = self.sorted_values(metric, scope, group)
+        if size == 0 or np.isnan(value):
+            # No value (e.g. goals per xG without any xG) has no rank
+            return np.nan
+        return np.searchsorted(sorted_values, value, side='right') / size * 100
+
+    def batch(self, rows, metrics, scope=POSITION):
+        """Percentile vectors for many players at once.
+
+        `rows` are index labels of the player frame. Each player is ranked
+        within their own group for `scope`. Returns a frame of rows x metrics.
+        """
+        positions = self.players.index.get_indexer(pd.Index(rows))
+        if (positions < 0).any():
+            raise KeyError("Unknown player rows requested")
+
+        columns = SCOPE_COLUMNS[scope]
+        if columns:
+            requested = self.players[columns].iloc[positions].reset_index(drop=True)
+            grouped = requested.groupby(columns, observed=True, sort=False).indices
+            group_members = {key if isinstance(key, tuple) else (key,): members
+                             for key, members in grouped.items()}
+        else:
+            group_members = {(): np.arange(len(positions))}
+
+        result = np.full((len(positions), len(metrics)), np.nan)
+        for j, metric in enumerate(metrics):
+            values = self.metric_values(metric)[positions]
+            for group, members in group_members.items():
+                sorted_values, size = self.sorted_values(metric, scope, group)
+                if size:
+                    ranks = np.searchsorted(sorted_values, values[members], side='right') / size * 100
+                    result[members, j] = np.where(np.isnan(values[members]), np.nan, ranks)
+
+        return pd.DataFrame(result, index=pd.Index(rows), columns=list(metrics))
+
+    def percentiles_of(self, player, metrics, scope=POSITION, group=()):
+        """Percentiles for a player line that is not a row of the index (e.g. a merged line)."""
+        return [self.percentile(float(line_value(player, metric)), metric, scope, group) for metric in metrics]
+
+
+def get_percentile_index(path):
+    """Percentile index for the current version of `path`, shared by all sessions."""
+    return derived(path, 'percentile_index', lambda players: PercentileIndex(players, path))
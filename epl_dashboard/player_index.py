@@ -0,0 +1,77 @@
+from data_loader import derived
+from metrics import line_value
+
+# Constant-time player lookups, built once per dataset version.
+#
+# Players are keyed by (team, player). A player who moved clubs mid-season has
+# one row per club (see cleaning note 5 in data_dictionary.txt), so every
+# player name also maps to all of their rows, and merged() combines those rows
+# into a single season line.
+
+# Season totals that add up across clubs
+SUM_COLUMNS = ['MP', 'Starts', '90s', 'Gls', 'Ast', 'G+A', 'xG', 'xAG', 'npxG', 'npxG+xAG',
+               'PrgC', 'PrgP', 'CrdY', 'CrdR']
+
+# Per-90 columns and the totals they are rebuilt from
+PER_90_COLUMNS = {'Gls_90': 'Gls', 'Ast_90': 'Ast', 'xG_90': 'xG', 'xAG_90': 'xAG'}
+
+# Derived columns, rebuilt by their registry definitions (see metrics.py)
+DERIVED_COLUMNS = ['Contributions_90', 'xContributions_90', 'Performance_vs_xG', 'Performance_vs_xAG',
+                   'Minutes_per_Goal', 'Minutes_per_Assist']
+
+
+class PlayerIndex:
+    def __init__(self, players):
+        self.players = players
+        teams = players['Team'].astype(str).to_numpy()
+        names = players['Player'].to_numpy()
+        labels = players.index.to_numpy()
+
+        self._by_key = dict(zip(zip(teams, names), labels))
+        self._by_player = {}
+        for name, label in zip(names, labels):
+            self._by_player.setdefault(name, []).append(label)
+
+    def get(self, team, player):
+        """Row for one player at one club, or None."""
+        label = self._by_key.get((team, player))
+        return None if label is None else self.players.loc[label]
+
+    def rows(self, player):
+        """All of a player's rows (one per club)."""
+        return self.players.loc[self._by_player.get(player, [])]
+
+    def teams(self, player):
+        return self.rows(player)['Team'].astype(str).tolist()
+
+    def is_transferred(self, player):
+        return len(self._by_player.get(player, [])) > 1
+
+    def merged(self, player):
+        """One combined season line for a player across all their clubs."""
+        rows = self.rows(player)
+        if len(rows) == 0:
+            raise KeyError(player)
+        if len(rows) == 1:
+            return rows.iloc[0]
+
+        # Club-level fields come from the club where they played the most
+        combined = rows.loc[rows['90s'].idxmax()].astype(object)
+        combined['Team'] = ' / '.join(rows['Team'].astype(str))
+        combined['Age'] = rows['Age'].max()
+        for col in SUM_COLUMNS:
+            if col in rows:
+                combined[col] = rows[col].sum()
+
+        nineties = combined['90s']
+        for col, total in PER_90_COLUMNS.items():
+            combined[col] = round(combined[total] / nineties, 2) if nineties else 0.0
+        for col in DERIVED_COLUMNS:
+            combined[col] = line_value(combined, col)
+        combined.name = None
+        return combined
+
+
+def get_player_index(path):
+    """Player index for the current version of `path`, shared by all sessions."""
+    return derived(path, 'player_index', PlayerIndex)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import derived
+
+# 2025 projection engine. Every player is scored in one vectorized pass over
+# plain arrays, and the result is a new frame - the loaded dataset is never
+# modified.
+
+# Default projection assumptions
+YOUNG_AGE = 24         # players younger than this are still improving
+YOUNG_FACTOR = 1.1
+VETERAN_AGE = 30       # players older than this start to decline
+VETERAN_FACTOR = 0.95
+MP_DISCOUNT = 0.95     # slightly conservative on appearances
+
+PREDICTION_COLUMNS = [
+    'Age_Factor', 'Predicted_MP_2025', 'Predicted_Goals_2025', 'Predicted_Assists_2025',
+    'Predicted_xG_2025', 'Predicted_xAG_2025', 'Predicted_GA_2025',
+]
+
+
+def age_factors(age, young_age=YOUNG_AGE, young_factor=YOUNG_FACTOR,
+                veteran_age=VETERAN_AGE, veteran_factor=VETERAN_FACTOR):
+    age = np.asarray(age, dtype=np.float64)
+    return np.select([age < young_age, age > veteran_age], [young_factor, veteran_factor], 1.0)
+
+
+def project(age, mp, nineties, gls_90, ast_90, xg_90, xag_90, mp_discount=MP_DISCOUNT, **age_params):
+    """Batch projection over arrays. Returns a dict of arrays, one per prediction column."""
+    factor = age_factors(age, **age_params)
+    # Expected minutes stay the same, scaled by the age factor
+    scaled_90s = np.asarray(nineties, dtype=np.float64) * factor
+
+    goals = np.round(np.asarray(gls_90) * scaled_90s).astype(np.int64)
+    assists = np.round(np.asarray(ast_90) * scaled_90s).astype(np.int64)
+    return {
+        'Age_Factor': factor,
+        'Predicted_MP_2025': (np.asarray(mp) * mp_discount).astype(np.int64),
+        'Predicted_Goals_2025': goals,
+        'Predicted_Assists_2025': assists,
+        'Predicted_xG_2025': np.round(np.asarray(xg_90) * scaled_90s, 2),
+        'Predicted_xAG_2025': np.round(np.asarray(xag_90) * scaled_90s, 2),
+        'Predicted_GA_2025': goals + assists,
+    }
+
+
+def predict_players(players, **params):
+    """Score the whole player table. Returns a new frame aligned to `players`' index."""
+    projected = project(
+        players['Age'].to_numpy(),
+        players['MP'].to_numpy(),
+        players['90s'].to_numpy(),
+        players['Gls_90'].to_numpy(),
+        players['Ast_90'].to_numpy(),
+        players['xG_90'].to_numpy(),
+        players['xAG_90'].to_numpy(),
+        **params,
+    )
+    predictions = pd.DataFrame(projected, index=players.index)
+    return pd.concat([players[['Player', 'Team', 'Age']], predictions], axis=1)
+
+
+def get_predictions(path, **params):
+    """Cached predictions for the current version of `path` and the given parameters.
+
+    The frame is shared between sessions, so callers must not modify it in place.
+    """
+    name = ('predictions', tuple(sorted(params.items())))
+    return derived(path, name, lambda players: predict_players(players, **params))
@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from correlations import CORRELATION_METRICS, TARGET
+from data_loader import derived
+from team_aggregates import get_team_stats
+
+# Resampling-based significance for the team-level correlations.
+#
+# With only 20 teams the t-test p-values lean hard on normality, so the
+# dashboard backs them with bootstrap confidence intervals and permutation
+# p-values. Every resample of every metric is computed as one NumPy batch;
+# large resample counts can be fanned out over a process pool.
+
+N_RESAMPLES = 10000
+CONFIDENCE = 0.95
+
+# Upper bound on floats held by one batch (resamples x rows x metrics)
+MAX_BATCH_VALUES = 4_000_000
+
+
+def _batch_sizes(n_resamples, n_rows, n_metrics):
+    per_resample = max(n_rows * (n_metrics + 1), 1)
+    batch = max(MAX_BATCH_VALUES // per_resample, 1)
+    return [min(batch, n_resamples - start) for start in range(0, n_resamples, batch)]
+
+
+def _batched_r(x, y):
+    """Correlations along axis 1: x is (batch, n, m), y is (batch, n). Returns (batch, m)."""
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    numerator = np.einsum('bnm,bn->bm', x, y)
+    denominator = np.sqrt(np.einsum('bnm,bnm->bm', x, x) * np.einsum('bn,bn->b', y, y)[:, None])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return numerator / denominator
+
+
+def _bootstrap_chunk(x, y, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in _batch_sizes(n_resamples, *x.shape):
+        rows = rng.integers(0, len(y), size=(size, len(y)))
+        results.append(_batched_r(x[rows], y[rows]))
+    return np.concatenate(results)
+
+
+def _permutation_chunk(x, y, n_resamples, seed):
+    # Only the target is shuffled, so the metrics are standardized once and
+    # each batch of permutations is a single matrix product
+    rng = np.random.default_rng(seed)
+    x = x - x.mean(axis=0)
+    x = x / np.sqrt((x ** 2).sum(axis=0))
+    results = []
+    for size in _batch_sizes(n_resamples, len(y), 1):
+        shuffled = rng.permuted(np.broadcast_to(y, (size, len(y))), axis=1)
+        shuffled = shuffled - shuffled.mean(axis=1, keepdims=True)
+        shuffled = shuffled / np.sqrt((shuffled ** 2).sum(axis=1, keepdims=True))
+        results.append(shuffled @ x)
+    return np.concatenate(results)
+
+
+def _run(chunk_function, x, y, n_resamples, seed, jobs):
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        return chunk_function(x, y, n_resamples, seed)
+
+    # Independent streams per worker, so the result doesn't depend on scheduling
+    seeds = np.random.SeedSequence(seed).spawn(jobs)
+    counts = [n_resamples // jobs + (i < n_resamples % jobs) for i in range(jobs)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        parts = pool.map(chunk_function, [x] * jobs, [y] * jobs, counts, seeds)
+        return np.concatenate(list(parts))
+
+
+def _arrays(frame, metrics, target):
+    data = frame[list(metrics) + [target]].dropna()
+    return data[list(metrics)].to_numpy(dtype=np.float64), data[target].to_numpy(dtype=np.float64)
+
+
+def bootstrap_ci(frame, metrics, target=TARGET, n_resamples=N_RESAMPLES, confidence=CONFIDENCE,
+                 seed=0, jobs=1):
+    """Percentile bootstrap confidence interval of each metric's correlation with `target`."""
+    x, y = _arrays(frame, metrics, target)
+    samples = _run(_bootstrap_chunk, x, y, n_resamples, seed, jobs)
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+    return pd.DataFrame({'ci_low': low, 'ci_high': high}, index=pd.Index(list(metrics), name='Metric'))
+
+
+def permutation_test(frame, metrics, target=TARGET, n_resamples=N_RESAMPLES, seed=0, jobs=1):
+    """Two-sided permutation p-value of each metric's correlation with `target`."""
+    x, y = _arrays(frame, metrics, target)
+    observed = _batched_r(x[None], y[None])[0]
+    permuted = _run(_permutation_chunk, x, y, n_resamples, seed, jobs)
+    exceed = (np.abs(permuted) >= np.abs(observed) - 1e-12).sum(axis=0)
+    return pd.DataFrame({'r': observed, 'permutation_p': (exceed + 1) / (n_resamples + 1)},
+                        index=pd.Index(list(metrics), name='Metric'))
+
+
+def significance_table(frame, metrics, target=TARGET, n_resamples=N_RESAMPLES,
+                       confidence=CONFIDENCE, seed=0, jobs=1):
+    """Observed r, bootstrap interval and permutation p-value per metric."""
+    return permutation_test(frame, metrics, target, n_resamples, seed, jobs).join(
+        bootstrap_ci(frame, metrics, target, n_resamples, confidence, seed, jobs))
+
+
+def get_significance(path, metrics=tuple(CORRELATION_METRICS), target=TARGET,
+                     n_resamples=N_RESAMPLES, confidence=CONFIDENCE, seed=0, jobs=1):
+    """Resampling results for the team view of `path`, cached per dataset version and arguments."""
+    metrics = tuple(metrics)
+    return derived(
+        path,
+        ('significance', metrics, target, n_resamples, confidence, seed),
+        lambda players: significance_table(get_team_stats(path), metrics, target,
+                                           n_resamples, confidence, seed, jobs),
+    )
+
+
+def format_evidence(row, confidence=CONFIDENCE):
+    """Short text for one metric's row of a significance table."""
+    p = row['permutation_p']
+    p_text = "p<0.001" if p < 0.001 else f"p={p:.3f}"
+    return f"r={row['r']:.3f}, {confidence:.0%} CI [{row['ci_low']:.2f}, {row['ci_high']:.2f}], {p_text}"
@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_players
+
+# Player data partitioned by competition and season.
+#
+# Partitions live under data/<competition>/<season>/players.csv, for example
+# data/premier-league/2023-24/players.csv (a snapshot built with snapshot.py
+# next to it is picked up automatically). Nothing is read until a view asks
+# for a partition, and each partition is cached on its own, so holding many
+# seasons costs only the ones actually being viewed.
+#
+# query() is the filter API on top of those per-file loads: the pages, the
+# leaderboards (through player_mask()) and analyze_winrate.py select players
+# by season, team, position, age and minimum 90s through it.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# EPL_DATA_DIR points the pages at another data tree (e.g. benchmark data)
+DATA_DIR = os.environ.get('EPL_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+PLAYERS_FILE = 'players.csv'
+
+# Files from before the data/ layout, used when no partition replaces them
+LEGACY_PARTITIONS = {
+    ('premier-league', '2023-24'): os.path.join(BASE_DIR, 'premier_league_with_win_rate.csv'),
+}
+
+
+def partition_label(partition):
+    competition, season = partition
+    return f"{competition.replace('-', ' ').title()} {season.replace('-', '/')}"
+
+
+def list_partitions(data_dir=DATA_DIR):
+    """All known partitions as {(competition, season): players file}, oldest season first."""
+    partitions = dict(LEGACY_PARTITIONS)
+    if os.path.isdir(data_dir):
+        for competition in os.scandir(data_dir):
+            if not competition.is_dir():
+                continue
+            for season in os.scandir(competition.path):
+                players_file = os.path.join(season.path, PLAYERS_FILE)
+                if season.is_dir() and os.path.exists(players_file):
+                    partitions[(competition.name, season.name)] = players_file
+    return dict(sorted(partitions.items(), key=lambda item: (item[0][1], item[0][0])))
+
+
+def partition_path(competition, season, data_dir=DATA_DIR):
+    partitions = list_partitions(data_dir)
+    if (competition, season) not in partitions:
+        raise KeyError(f"No data for {competition} {season}")
+    return partitions[(competition, season)]
+
+
+def latest_partition(competition=None, data_dir=DATA_DIR):
+    partitions = [p for p in list_partitions(data_dir) if competition is None or p[0] == competition]
+    if not partitions:
+        raise KeyError(f"No data for {competition}")
+    return partitions[-1]
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    return [value] if isinstance(value, str) else list(value)
+
+
+def player_mask(players, team=None, position=None, min_90s=None, min_age=None, max_age=None):
+    """Rows of `players` passing the filters as a boolean array, or None if nothing is filtered.
+
+    `team` and `position` take a single value or a list; None means no filter.
+    """
+    teams, positions = _as_list(team), _as_list(position)
+    conditions = []
+    if teams is not None:
+        conditions.append(players['Team'].isin(teams))
+    if positions is not None:
+        conditions.append(players['Primary_Pos'].isin(positions))
+    if min_90s is not None:
+        conditions.append(players['90s'] >= min_90s)
+    if min_age is not None:
+        conditions.append(players['Age'] >= min_age)
+    if max_age is not None:
+        conditions.append(players['Age'] <= max_age)
+    if not conditions:
+        return None
+    return np.logical_and.reduce([condition.to_numpy(dtype=bool) for condition in conditions])
+
+
+def query(season=None, competition=None, team=None, position=None, min_90s=None, min_age=None, max_age=None,
+          path=None, data_dir=DATA_DIR):
+    """Players matching the filters, loading only the partitions they touch.
+
+    Every filter takes a single value or a list; None means no filter. `path`
+    reads one players file (in the store or not) instead of selecting
+    partitions. When the result spans several partitions it gets Competition
+    and Season columns. The result may be the shared cached frame, so don't
+    modify it in place.
+    """
+    if path is not None:
+        selected = [(None, path)]
+    else:
+        seasons, competitions = _as_list(season), _as_list(competition)
+        selected = [
+            (key, partition) for key, partition in list_partitions(data_dir).items()
+            if (competitions is None or key[0] in competitions) and (seasons is None or key[1] in seasons)
+        ]
+
+    frames = []
+    for key, players_file in selected:
+        players = load_players(players_file)
+        mask = player_mask(players, team, position, min_90s, min_age, max_age)
+        if mask is not None:
+            players = players[mask]
+        if len(selected) > 1:
+            players = players.assign(Competition=key[0], Season=key[1])
+        frames.append(players)
+
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import derived
+from metrics import line_value, metric_values
+
+# Nearest-neighbour search over per-90 player profiles.
+#
+# Every player is a vector of standardized (z-scored) per-90 features, kept in
+# one float32 matrix built once per dataset version. A query is a single
+# matrix-vector product against that matrix - |x - q|^2 = |x|^2 - 2 x.q + |q|^2
+# - followed by a partial sort, so it costs O(players x features) and no
+# pairwise distance matrix is ever built. Filters are boolean masks applied
+# before the partial sort.
+
+# Columns or registry metrics (see metrics.py)
+FEATURES = ['Gls_90', 'Ast_90', 'xG_90', 'xAG_90', 'Contributions_90', 'xContributions_90',
+            'PrgC_90', 'PrgP_90']
+
+RESULT_COLUMNS = ['Player', 'Team', 'Primary_Pos', 'Age', '90s']
+
+TOP_K = 10
+
+
+def feature_frame(players, features=FEATURES):
+    """Per-90 feature values of `players` (a frame, or one player as a Series)."""
+    if isinstance(players, pd.Series):
+        return pd.Series({col: line_value(players, col) for col in features}, dtype=np.float64)
+    return pd.DataFrame({col: metric_values(players, col) for col in features}, index=players.index)
+
+
+class SimilarityIndex:
+    def __init__(self, players, features=FEATURES):
+        self.players = players
+        self.features = list(features)
+
+        values = np.nan_to_num(feature_frame(players, self.features).to_numpy(), nan=0.0)
+        self.mean = values.mean(axis=0)
+        std = values.std(axis=0)
+        self.std = np.where(std > 0, std, 1.0)
+
+        self.vectors = ((values - self.mean) / self.std).astype(np.float32)
+        self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+        # Names and positions as integer codes, so filters compare ints
+        self._name_codes, names = pd.factorize(players['Player'])
+        self._names = {name: code for code, name in enumerate(names)}
+        self._position_codes, positions = pd.factorize(players['Primary_Pos'].astype(str))
+        self._positions = {position: code for code, position in enumerate(positions)}
+        self.ages = players['Age'].to_numpy(dtype=np.float64)
+        self.nineties = players['90s'].to_numpy(dtype=np.float64)
+
+    def standardize(self, profile):
+        """Standardized vector for one player line (a row, or a merged multi-club line)."""
+        values = np.nan_to_num(feature_frame(profile, self.features).to_numpy(), nan=0.0)
+        return ((values - self.mean) / self.std).astype(np.float32)
+
+    def mask(self, position=None, min_age=None, max_age=None, min_90s=None):
+        """Rows passing the filters (None means no filter)."""
+        keep = np.ones(len(self.vectors), dtype=bool)
+        if position is not None:
+            keep &= self._position_codes == self._positions.get(position, -2)
+        if min_age is not None:
+            keep &= self.ages >= min_age
+        if max_age is not None:
+            keep &= self.ages <= max_age
+        if min_90s is not None:
+            keep &= self.nineties >= min_90s
+        return keep
+
+    def nearest(self, vector, k=TOP_K, keep=None):
+        """Row positions and distances of the `k` rows closest to `vector`."""
+        distances = self.norms - 2 * (self.vectors @ vector) + vector @ vector
+        if keep is not None:
+            distances[~keep] = np.inf
+
+        k = min(k, int(np.isfinite(distances).sum()))
+        if k == 0:
+            return np.array([], dtype=np.intp), np.array([])
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind='stable')]
+        return top, np.sqrt(np.maximum(distances[top], 0.0))
+
+    def similar(self, profile, k=TOP_K, position=None, min_age=None, max_age=None, min_90s=None):
+        """The `k` players most similar to `profile`, closest first.
+
+        The player's own rows (all clubs) are left out. Returns the player
+        columns, the features and a Distance column (in standard deviations).
+        """
+        keep = self.mask(position, min_age, max_age, min_90s)
+        keep &= self._name_codes != self._names.get(profile['Player'], -2)
+
+        rows, distances = self.nearest(self.standardize(profile), k, keep)
+        result = self.players.iloc[rows][RESULT_COLUMNS].copy()
+        features = feature_frame(self.players.iloc[rows], self.features)
+        result = pd.concat([result, features.round(2)], axis=1)
+        result['Distance'] = distances.round(2)
+        return result
+
+
+def get_similarity_index(path):
+    """Similarity index for the current version of `path`, shared by all sessions."""
+    return derived(path, 'similarity_index', SimilarityIndex)
@@ -0,0 +1,211 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_loader import derived
+from season_store import latest_partition, partition_path
+from team_aggregates import get_team_stats
+
+# Monte Carlo projection of next season's table.
+#
+# Every team gets a strength rating from the team aggregates - the squad's
+# expected goal involvement per 90 (xG + xAG), blended with last season's win
+# rate - and every fixture of a double round robin is played as two Poisson
+# goal counts whose means depend on the rating gap and home advantage. Seasons
+# are simulated as (seasons x fixtures) arrays, a batch at a time; points and
+# goals are summed per team with one matrix product, and the table is ranked on
+# points, goal difference and goals scored. Goals are drawn by inverting each
+# fixture's Poisson CDF with float32 uniforms, several times faster than
+# Generator.poisson. Batches get their own random streams, so a given seed
+# gives the same result whatever the number of jobs.
+
+N_SEASONS = 100_000
+GOALS_PER_MATCH = 2.8
+HOME_ADVANTAGE = 0.25   # log goal-rate boost for the home side
+SPREAD = 0.45           # log goal-rate change per standard deviation of rating gap
+FORM_WEIGHT = 0.5       # weight of last season's win rate in the rating
+
+# Places at either end of the table that are reported as odds
+TOP_PLACES = 4
+RELEGATION_PLACES = 3
+
+# Seasons per batch; 10k seasons of a 380-match league is ~4M matches
+BATCH_SEASONS = 10_000
+
+# Points for each goal margin, indexed as described in _simulate_batch
+HOME_POINTS = np.array([1] + [3] * 127 + [0] * 128, dtype=np.float32)
+AWAY_POINTS = np.array([1] + [0] * 127 + [3] * 128, dtype=np.float32)
+
+
+def _zscore(values):
+    values = np.asarray(values, dtype=np.float64)
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def team_ratings(team_stats, form_weight=FORM_WEIGHT):
+    """Strength rating per team (mean 0, about unit spread), indexed by team."""
+    creation = np.log(np.maximum(team_stats['xG_90'] + team_stats['xAG_90'], 1e-6))
+    # A team missing from the standings (see add_win_rate.py) gets an average form
+    form = team_stats['Team_Win_Rate'].astype(np.float64)
+    form = form.fillna(form.mean() if form.notna().any() else 0.0)
+    rating = (1 - form_weight) * _zscore(creation) + form_weight * _zscore(form)
+    return pd.Series(_zscore(rating), index=team_stats.index.get_level_values('Team'), name='Rating')
+
+
+def fixtures(n_teams):
+    """Home and away team positions of every match in a double round robin."""
+    home, away = np.nonzero(~np.eye(n_teams, dtype=bool))
+    return home, away
+
+
+def goal_rates(ratings, goals_per_match=GOALS_PER_MATCH, home_advantage=HOME_ADVANTAGE, spread=SPREAD):
+    """Expected home and away goals of every fixture."""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    home, away = fixtures(len(ratings))
+    gap = spread * (ratings[home] - ratings[away]) / 2
+    base = goals_per_match / 2
+    return base * np.exp(home_advantage / 2 + gap), base * np.exp(-home_advantage / 2 - gap)
+
+
+def goal_cdf(rates, tail=1e-7):
+    """Poisson CDF of every fixture as a (goals x fixtures) table, up to the last count with mass above `tail`."""
+    rates = np.asarray(rates, dtype=np.float64)
+    pmf = np.exp(-rates)
+    cdf = [pmf]
+    goals = 0
+    while (1 - cdf[-1]).max() > tail:
+        goals += 1
+        pmf = pmf * rates / goals
+        cdf.append(cdf[-1] + pmf)
+    return np.array(cdf[:-1], dtype=np.float32)
+
+
+def _sample_goals(rng, cdf, n_seasons):
+    # The number of CDF steps a uniform lands above is a Poisson draw
+    uniform = rng.random((n_seasons, cdf.shape[1]), dtype=np.float32)
+    goals = np.zeros((n_seasons, cdf.shape[1]), dtype=np.int8)
+    for step in cdf:
+        goals += uniform > step
+    return goals
+
+
+def _simulate_batch(home_cdf, away_cdf, n_seasons, seed):
+    """Final points and positions (0 = champions) of `n_seasons` simulated seasons."""
+    rng = np.random.default_rng(seed)
+    n_teams = int(round((1 + np.sqrt(1 + 4 * home_cdf.shape[1])) / 2))
+    home, away = fixtures(n_teams)
+
+    home_goals = _sample_goals(rng, home_cdf, n_seasons)
+    away_goals = _sample_goals(rng, away_cdf, n_seasons)
+    # Points by table lookup on the goal margin: as uint8, 0 is a draw, 1-127 a
+    # home win and 128-255 (negative margins) an away win
+    margin = (home_goals - away_goals).view(np.uint8)
+    home_points = np.take(HOME_POINTS, margin)
+    away_points = np.take(AWAY_POINTS, margin)
+
+    # Fixture -> team incidence, so per-team sums are one matrix product each
+    at_home = np.zeros((len(home), n_teams), dtype=np.float32)
+    at_home[np.arange(len(home)), home] = 1
+    away_from_home = np.zeros((len(away), n_teams), dtype=np.float32)
+    away_from_home[np.arange(len(away)), away] = 1
+
+    points = home_points @ at_home + away_points @ away_from_home
+    scored = home_goals.astype(np.float32) @ at_home + away_goals.astype(np.float32) @ away_from_home
+    conceded = away_goals.astype(np.float32) @ at_home + home_goals.astype(np.float32) @ away_from_home
+
+    # Points, then goal difference, then goals scored; remaining ties broken at
+    # random. Goals come in under 128 a match (see margin above), so over 38
+    # matches goals scored and goal difference (+5000) each fit in a 1e4 tier
+    tiebreak = rng.random((n_seasons, n_teams))
+    key = (points.astype(np.float64) * 1e8 + (scored - conceded + 5000) * 1e4 + scored + tiebreak * 0.5)
+    order = np.argsort(-key, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_teams), axis=1)
+    return points.astype(np.int16), positions.astype(np.int8)
+
+
+def simulate_seasons(ratings, n_seasons=N_SEASONS, goals_per_match=GOALS_PER_MATCH,
+                     home_advantage=HOME_ADVANTAGE, spread=SPREAD, seed=0, jobs=1):
+    """Simulate `n_seasons` seasons for teams with the given ratings (a Series indexed by team).
+
+    Returns a frame indexed by team with expected points and position, points
+    percentiles, title/top-places/relegation odds and the probability of every
+    final position (columns 1..n), sorted by expected points.
+    """
+    teams = ratings.index
+    n_teams = len(teams)
+    home_rates, away_rates = goal_rates(ratings.to_numpy(), goals_per_match, home_advantage, spread)
+    home_cdf, away_cdf = goal_cdf(home_rates), goal_cdf(away_rates)
+
+    sizes = [min(BATCH_SEASONS, n_seasons - start) for start in range(0, n_seasons, BATCH_SEASONS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(sizes) == 1:
+        parts = list(map(_simulate_batch, [home_cdf] * len(sizes), [away_cdf] * len(sizes), sizes, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(sizes))) as pool:
+            parts = list(pool.map(_simulate_batch, [home_cdf] * len(sizes), [away_cdf] * len(sizes),
+                                  sizes, seeds))
+    points = np.concatenate([part[0] for part in parts])
+    positions = np.concatenate([part[1] for part in parts])
+
+    # Position counts per team in one bincount
+    counts = np.bincount((np.arange(n_teams) * n_teams + positions).ravel(), minlength=n_teams * n_teams)
+    probabilities = counts.reshape(n_teams, n_teams) / n_seasons
+
+    low, median, high = np.percentile(points, [10, 50, 90], axis=0)
+    table = pd.DataFrame({
+        'Rating': ratings.to_numpy().round(3),
+        'Expected_Points': points.mean(axis=0).round(1),
+        'Points_P10': low,
+        'Points_Median': median,
+        'Points_P90': high,
+        'Expected_Position': (probabilities @ np.arange(1, n_teams + 1)).round(2),
+        'Title': probabilities[:, 0],
+        f'Top_{TOP_PLACES}': probabilities[:, :TOP_PLACES].sum(axis=1),
+        'Relegation': probabilities[:, n_teams - RELEGATION_PLACES:].sum(axis=1),
+    }, index=pd.Index(teams, name='Team'))
+    positions_table = pd.DataFrame(probabilities, index=table.index, columns=range(1, n_teams + 1))
+    return pd.concat([table, positions_table], axis=1).sort_values('Expected_Points', ascending=False)
+
+
+def get_season_simulation(path, n_seasons=N_SEASONS, goals_per_match=GOALS_PER_MATCH,
+                          home_advantage=HOME_ADVANTAGE, spread=SPREAD, form_weight=FORM_WEIGHT,
+                          seed=0, jobs=1):
+    """Simulated next-season table for the teams of `path`, cached per dataset version and parameters.
+
+    `jobs` only changes how fast the result arrives, not the result, so it isn't part of the key.
+    """
+    params = (n_seasons, goals_per_match, home_advantage, spread, form_weight, seed)
+    return derived(
+        path,
+        ('season_simulation',) + params,
+        lambda players: simulate_seasons(team_ratings(get_team_stats(path), form_weight), n_seasons,
+                                         goals_per_match, home_advantage, spread, seed, jobs),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate next season's table from a season's team aggregates.")
+    parser.add_argument('--season', help="competition/season to start from (default: the latest)")
+    parser.add_argument('--seasons', type=int, default=N_SEASONS, help="number of simulated seasons")
+    parser.add_argument('--form-weight', type=float, default=FORM_WEIGHT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    partition = tuple(args.season.split('/', 1)) if args.season else latest_partition()
+    team_stats = get_team_stats(partition_path(*partition))
+    table = simulate_seasons(team_ratings(team_stats, args.form_weight), args.seasons, seed=args.seed, jobs=args.jobs)
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(table[['Expected_Points', 'Points_P10', 'Points_P90', 'Expected_Position',
+                     'Title', f'Top_{TOP_PLACES}', 'Relegation']])
+
+
+if __name__ == '__main__':
+    main()
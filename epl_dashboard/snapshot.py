@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Binary columnar snapshots of the CSV datasets.
+#
+# A snapshot is a directory of one .npy file per column plus a manifest.json.
+# Numeric columns are stored as-is, string columns as integer codes with their
+# categories kept in the manifest. Loading memory-maps every column, so a cold
+# start costs a few file opens, and several worker processes on one host share
+# the same pages through the OS page cache.
+#
+# Build the snapshots next to the CSV files with:
+#   python snapshot.py
+
+SNAPSHOT_SUFFIX = '.snapshot'
+MANIFEST_NAME = 'manifest.json'
+FORMAT_VERSION = 2
+
+DEFAULT_SOURCES = [
+    'premier_league_cleaned.csv',
+    'premier_league_with_win_rate.csv',
+    'team_performance_summary.csv',
+]
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+def read_manifest(directory):
+    """Return the snapshot manifest, or None if there is no usable snapshot."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _codes_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def write_snapshot(df, directory, source_hash=None, source_signature=None, spec=None):
+    """Write `df` as a column set into `directory`, replacing any old snapshot.
+
+    `spec` is any JSON value describing how `df` was derived, for readers to check.
+    """
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        file_name = f"col_{i:03d}.npy"
+        entry = {'name': col, 'file': file_name}
+
+        if isinstance(series.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(series):
+            # Strings (and existing categoricals) are stored as codes
+            categorical = pd.Categorical(series)
+            categories = categorical.categories.tolist()
+            values = categorical.codes.astype(_codes_dtype(len(categories)))
+            entry['kind'] = 'category' if isinstance(series.dtype, pd.CategoricalDtype) else 'string'
+            entry['categories'] = categories
+        elif isinstance(series.array, pd.arrays.IntegerArray):
+            # Nullable integers (standings of unknown teams): values plus a mask of the gaps
+            values = series.array.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+            entry['kind'] = 'nullable'
+            entry['mask'] = f"col_{i:03d}_mask.npy"
+            np.save(os.path.join(tmp_dir, entry['mask']), series.isna().to_numpy())
+        else:
+            values = series.to_numpy()
+            entry['kind'] = 'numeric'
+
+        np.save(os.path.join(tmp_dir, file_name), np.ascontiguousarray(values))
+        columns.append(entry)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'rows': len(df),
+        'columns': columns,
+        'source_hash': source_hash,
+        'source_signature': list(source_signature) if source_signature else None,
+        'spec': spec,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    # Swap the new snapshot in; processes that still map the old files keep
+    # reading them until they reload
+    old_dir = f"{directory}.old-{os.getpid()}"
+    if os.path.exists(directory):
+        os.rename(directory, old_dir)
+    os.rename(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_snapshot(directory, manifest=None):
+    """Load a snapshot with every numeric column memory-mapped read-only."""
+    if manifest is None:
+        manifest = read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No snapshot found at {directory}")
+
+    data = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+        if entry['kind'] == 'numeric':
+            data[entry['name']] = values
+        elif entry['kind'] == 'nullable':
+            mask = np.load(os.path.join(directory, entry['mask']))
+            data[entry['name']] = pd.arrays.IntegerArray(np.array(values), mask)
+        else:
+            categorical = pd.Categorical.from_codes(values, categories=entry['categories'])
+            if entry['kind'] == 'string':
+                data[entry['name']] = pd.Series(np.asarray(categorical, dtype=object), dtype='str')
+            else:
+                data[entry['name']] = categorical
+
+    # copy=False keeps the numeric columns backed by the mapped files
+    return pd.DataFrame(data, copy=False)
+
+
+def build_snapshot(csv_path):
+    """Parse `csv_path` and write its snapshot next to it. Returns the snapshot path."""
+    from data_loader import file_hash, file_signature, read_players
+
+    directory = snapshot_path(csv_path)
+    write_snapshot(
+        read_players(csv_path),
+        directory,
+        source_hash=file_hash(csv_path),
+        source_signature=file_signature(csv_path),
+    )
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build binary column snapshots of the CSV datasets.")
+    parser.add_argument('csv_files', nargs='*', default=DEFAULT_SOURCES,
+                        help="CSV files to convert (default: the three dashboard datasets)")
+    args = parser.parse_args()
+
+    for csv_path in args.csv_files:
+        if not os.path.exists(csv_path):
+            print(f"Skipping {csv_path}: file not found")
+            continue
+        directory = build_snapshot(csv_path)
+        print(f"{csv_path} -> {directory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+
+from data_loader import data_version, derived
+from snapshot import SNAPSHOT_SUFFIX, read_manifest, read_snapshot, write_snapshot
+
+# Team-level aggregate view shared by the dashboard and analyze_winrate.py.
+# It is computed once per dataset version, kept in memory and persisted next to
+# the source file, so reruns only look it up instead of grouping every player.
+
+# Team standings are repeated on every player row, so take the first value;
+# player metrics are averaged over the squad
+TEAM_AGGREGATIONS = {
+    'Team_Win_Rate': 'first',
+    'Team_Position': 'first',
+    'Team_Points': 'first',
+    'Gls_90': 'mean',
+    'Ast_90': 'mean',
+    'Contributions_90': 'mean',
+    'xG_90': 'mean',
+    'xAG_90': 'mean',
+    'Performance_vs_xG': 'mean',
+    'Performance_vs_xAG': 'mean',
+    'PrgC': 'mean',
+    'PrgP': 'mean',
+}
+
+# Rows are keyed by team, and by competition/season when the data has them
+KEY_COLUMNS = ['Competition', 'Season', 'Team']
+
+DECIMALS = 3
+
+# Recorded with the persisted view: a view built under other aggregations is
+# recomputed even though the players file hasn't changed
+SPEC = {'aggregations': TEAM_AGGREGATIONS, 'keys': KEY_COLUMNS, 'decimals': DECIMALS}
+
+
+def group_keys(players):
+    return [col for col in KEY_COLUMNS if col in players.columns]
+
+
+def compute_team_stats(players):
+    """Aggregate player rows into one row per team."""
+    aggregations = {col: how for col, how in TEAM_AGGREGATIONS.items() if col in players.columns}
+    # Average in float64 - the shared frame keeps exact counts as float32
+    players = players.astype({col: 'float64' for col in aggregations if players[col].dtype == 'float32'})
+    return players.groupby(group_keys(players), observed=True).agg(aggregations).round(DECIMALS)
+
+
+def refresh_teams(team_stats, players, teams):
+    """Recompute only the rows for `teams` and return the updated view."""
+    teams = list(teams)
+    changed = compute_team_stats(players[players['Team'].isin(teams)])
+
+    team_level = team_stats.index.get_level_values('Team')
+    unchanged = team_stats[~team_level.isin(teams)]
+    return pd.concat([unchanged, changed]).sort_index()
+
+
+def team_stats_path(path):
+    return os.path.splitext(path)[0] + '.team_stats' + SNAPSHOT_SUFFIX
+
+
+def _read_persisted(path, version):
+    directory = team_stats_path(path)
+    manifest = read_manifest(directory)
+    if manifest is None or manifest['source_hash'] != version or manifest.get('spec') != SPEC:
+        return None
+    persisted = read_snapshot(directory, manifest)
+    return persisted.set_index(group_keys(persisted))
+
+
+def _build_team_stats(path, players):
+    version = data_version(path)
+    team_stats = _read_persisted(path, version)
+    if team_stats is None:
+        team_stats = compute_team_stats(players)
+        try:
+            write_snapshot(team_stats.reset_index(), team_stats_path(path), source_hash=version, spec=SPEC)
+        except OSError:
+            # Read-only deployments still get the in-memory view
+            pass
+    return team_stats
+
+
+def get_team_stats(path):
+    """Return the team aggregate view for the current version of `path`.
+
+    The view is shared between sessions, so callers must not modify it in place.
+    """
+    path = os.path.abspath(path)
+    return derived(path, 'team_stats', lambda players: _build_team_stats(path, players))
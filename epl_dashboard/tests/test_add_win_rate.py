@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+
+from add_win_rate import add_win_rate
+from correlations import get_correlations
+from data_loader import load_players
+from snapshot import build_snapshot
+from team_aggregates import get_team_stats
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _players_with_unknown_team(tmp_path):
+    cleaned = pd.read_csv(os.path.join(BASE_DIR, 'premier_league_cleaned.csv'))
+    cleaned.loc[0, 'Team'] = 'Unknown FC'
+    cleaned_path = tmp_path / 'cleaned.csv'
+    cleaned.to_csv(cleaned_path, index=False)
+
+    output_path = tmp_path / 'players.csv'
+    rows, _, unknown = add_win_rate(str(cleaned_path), os.path.join(BASE_DIR, 'team_standings_2023_24.csv'),
+                                    str(output_path))
+    assert rows == len(cleaned)
+    assert unknown == {'Unknown FC': 1}
+    return str(output_path)
+
+
+def test_unknown_team_loads_with_empty_standings(tmp_path):
+    path = _players_with_unknown_team(tmp_path)
+    players = load_players(path)
+
+    unknown = players[players['Team'] == 'Unknown FC']
+    assert len(unknown) == 1
+    assert unknown[['Team_Win_Rate', 'Team_Position', 'Team_Points']].isna().all(axis=None)
+    # Everyone else keeps their standings
+    assert players.loc[players['Team'] != 'Unknown FC', 'Team_Position'].notna().all()
+
+
+def test_unknown_team_is_skipped_by_team_analysis(tmp_path):
+    path = _players_with_unknown_team(tmp_path)
+
+    team_stats = get_team_stats(path)
+    assert pd.isna(team_stats.loc['Unknown FC', 'Team_Position'])
+    # Correlations only use teams with standings
+    assert (get_correlations(path)['n'] == len(team_stats) - 1).all()
+
+
+def test_unknown_team_survives_a_snapshot(tmp_path):
+    path = _players_with_unknown_team(tmp_path)
+    expected = load_players(path)
+    build_snapshot(path)
+
+    from data_loader import forget
+    forget(path)
+    players = load_players(path)
+    assert players['Team_Position'].isna().sum() == 1
+    assert players['Team_Points'].fillna(-1).tolist() == expected['Team_Points'].fillna(-1).tolist()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+import matchweek
+from data_loader import forget, load_players, publish
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _season(tmp_path):
+    path = str(tmp_path / 'players.csv')
+    shutil.copy(os.path.join(BASE_DIR, 'premier_league_with_win_rate.csv'), path)
+    return path
+
+
+def test_ingest_on_a_cold_path(tmp_path):
+    path = _season(tmp_path)
+    forget(path)
+    deltas = pd.DataFrame({'Player': ['Bukayo Saka'], 'Team': ['Arsenal'], 'Minutes': [90], 'Gls': [1]})
+    goals = load_players(path).set_index(['Team', 'Player']).loc[('Arsenal', 'Bukayo Saka'), 'Gls']
+    forget(path)
+
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(matchweek.ingest(path, deltas)), daemon=True)
+    worker.start()
+    worker.join(30)
+    assert not worker.is_alive(), "ingest() did not finish"
+
+    assert result['teams'] == ['Arsenal']
+    players = load_players(path).set_index(['Team', 'Player'])
+    assert players.loc[('Arsenal', 'Bukayo Saka'), 'Gls'] == goals + 1
+    # A fresh load replays the log to the same data
+    forget(path)
+    assert load_players(path).set_index(['Team', 'Player']).loc[('Arsenal', 'Bukayo Saka'), 'Gls'] == goals + 1
+
+
+def test_publish_needs_a_loaded_path(tmp_path):
+    path = _season(tmp_path)
+    forget(path)
+    with pytest.raises(RuntimeError):
+        publish(path, pd.DataFrame())
@@ -0,0 +1,227 @@
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+
+# Timing spans for the hot paths of the pages and the analysis scripts.
+#
+# Off unless EPL_TIMING=1 is set; while off, span() and run() hand back one
+# shared no-op context manager, so instrumented code pays a function call and
+# nothing else. While on, every run (a page rerun, a fragment rerun or a script
+# invocation) collects the named spans timed inside it and is appended as one
+# JSON line to a rotating log:
+#   {"run": "dashboard", "session": "...", "started": ..., "total_ms": ...,
+#    "context": {"team": "Arsenal", ...}, "spans": [["load_players", 1.2], ...]}
+#
+#   timing.start('dashboard', session_id=timing.session_id())
+#   with timing.span('team_stats'):
+#       ...
+#   timing.finish()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ENABLED = os.environ.get('EPL_TIMING', '').lower() not in ('', '0', 'false', 'no')
+LOG_FILE = os.environ.get('EPL_TIMING_LOG', os.path.join(BASE_DIR, 'timing.jsonl'))
+LOG_MAX_BYTES = 5 * 1024 ** 2
+LOG_BACKUPS = 3
+
+# Finished runs kept per session for the debug panel
+RECENT_RUNS = 20
+
+_NULL = nullcontext()
+_local = threading.local()
+
+_recent = {}
+_recent_lock = threading.Lock()
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            logger = logging.getLogger('epl_dashboard.timing')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+class _Span:
+    __slots__ = ('name', 'run', 'start')
+
+    def __init__(self, name, run):
+        self.name = name
+        self.run = run
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run.spans.append((self.name, round((time.perf_counter() - self.start) * 1000, 3)))
+        return False
+
+
+class _Run:
+    def __init__(self, name, session_id, context):
+        self.name = name
+        self.session_id = session_id or f"pid-{os.getpid()}"
+        self.context = dict(context)
+        self.spans = []
+
+    def __enter__(self):
+        self.started = time.time()
+        self.start = time.perf_counter()
+        _local.run = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.run = None
+        record = {
+            'run': self.name,
+            'session': self.session_id,
+            'started': round(self.started, 3),
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 3),
+            'context': self.context,
+            'spans': self.spans,
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+
+        with _recent_lock:
+            _recent.setdefault(self.session_id, deque(maxlen=RECENT_RUNS)).append(record)
+        try:
+            _get_logger().info(json.dumps(record, default=str))
+        except OSError:
+            # A read-only deployment still gets the in-app panel
+            pass
+        return False
+
+
+def span(name):
+    """Time the enclosed block as `name` within the current run."""
+    if not ENABLED:
+        return _NULL
+    current = getattr(_local, 'run', None)
+    if current is None:
+        return _NULL
+    return _Span(name, current)
+
+
+def run(name, session_id=None, **context):
+    """Collect the spans of one rerun or script invocation and log them.
+
+    Nested inside another run (a fragment during a full rerun) this is just a
+    span of the outer run.
+    """
+    if not ENABLED:
+        return _NULL
+    current = getattr(_local, 'run', None)
+    if current is not None:
+        current.context.update(context)
+        return _Span(name, current)
+    return _Run(name, session_id, context)
+
+
+def start(name, session_id=None, **context):
+    """Begin a run for a whole page script; a stale run left by st.stop() is dropped."""
+    if ENABLED:
+        _Run(name, session_id, context).__enter__()
+
+
+def finish():
+    """End the run begun with start() and log it."""
+    current = getattr(_local, 'run', None) if ENABLED else None
+    if current is not None:
+        current.__exit__(None, None, None)
+
+
+def timed(name):
+    """Decorator form of run(), for page fragments. A no-op when disabled."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with run(name, session_id=session_id()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def note(**context):
+    """Attach selection context (team, player, metric...) to the current run."""
+    if not ENABLED:
+        return
+    current = getattr(_local, 'run', None)
+    if current is not None:
+        current.context.update(context)
+
+
+def current_spans():
+    current = getattr(_local, 'run', None)
+    return list(current.spans) if current is not None else []
+
+
+def recent_runs(session_id):
+    with _recent_lock:
+        return list(_recent.get(session_id, ()))
+
+
+def session_id():
+    """Streamlit session id of the running script, or a per-process id."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+    return ctx.session_id if ctx is not None else f"pid-{os.getpid()}"
+
+
+def debug_panel():
+    """Sidebar expander with this rerun's stage timings (only when enabled)."""
+    if not ENABLED:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    from data_loader import memory_report
+    from figure_cache import figure_cache
+
+    with st.sidebar.expander("⏱️ Timings", expanded=False):
+        spans = current_spans()
+        if spans:
+            st.markdown("**This rerun**")
+            st.dataframe(pd.DataFrame(spans, columns=['Stage', 'ms']), hide_index=True,
+                         use_container_width=True)
+
+        # Fragment reruns finish without a full rerun, so show them as a history
+        fragments = [r for r in recent_runs(session_id()) if ':' in r['run']][-5:]
+        if fragments:
+            st.markdown("**Recent section reruns**")
+            st.dataframe(pd.DataFrame([(r['run'], r['total_ms']) for r in reversed(fragments)],
+                                      columns=['Section', 'ms']),
+                         hide_index=True, use_container_width=True)
+
+        report = memory_report()
+        if len(report):
+            st.markdown("**Shared datasets**")
+            st.dataframe(report[['dataset', 'format', 'rows', 'memory_mb']], hide_index=True,
+                         use_container_width=True)
+
+        stats = figure_cache.stats()
+        st.caption(f"Figure cache: {stats['entries']} figures, {stats['hit_rate']:.0%} hit rate. "
+                   f"Log: {LOG_FILE}")